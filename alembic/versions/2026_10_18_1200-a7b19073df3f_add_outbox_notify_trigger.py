@@ -0,0 +1,46 @@
+"""add outbox notify trigger
+
+Revision ID: a7b19073df3f
+Revises: 779f0a758d06
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a7b19073df3f"
+down_revision: Union[str, None] = "779f0a758d06"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Канал должен совпадать с settings.outbox.notify_channel.
+    # NOTIFY доставляется после коммита вставки, один раз на оператор
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_outbox_pending() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('outbox_pending', '');
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER outbox_notify
+        AFTER INSERT ON outbox
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_outbox_pending()
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS outbox_notify ON outbox")
+    op.execute("DROP FUNCTION IF EXISTS notify_outbox_pending()")
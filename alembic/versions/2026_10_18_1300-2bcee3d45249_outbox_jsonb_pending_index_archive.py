@@ -0,0 +1,82 @@
+"""outbox jsonb, pending index and archive
+
+Revision ID: 2bcee3d45249
+Revises: a7b19073df3f
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "2bcee3d45249"
+down_revision: Union[str, None] = "a7b19073df3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        "outbox",
+        "payload",
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        existing_type=postgresql.JSON(astext_type=sa.Text()),
+        existing_nullable=False,
+        postgresql_using="payload::jsonb",
+    )
+    op.create_table(
+        "outbox_archive",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(
+                "sent", "pending", "failed", name="status", create_type=False
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_outbox_archive")),
+    )
+    # CONCURRENTLY не блокирует вставки в outbox, но не работает внутри
+    # транзакции миграции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_outbox_pending_created_at",
+            "outbox",
+            ["created_at"],
+            postgresql_where=sa.text("status = 'pending'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_outbox_pending_created_at",
+            table_name="outbox",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_table("outbox_archive")
+    op.alter_column(
+        "outbox",
+        "payload",
+        type_=postgresql.JSON(astext_type=sa.Text()),
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        existing_nullable=False,
+        postgresql_using="payload::json",
+    )
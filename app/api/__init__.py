@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 
+from .admin import admin_router
 from .auth import auth_router
 
 router = APIRouter()
 
 router.include_router(auth_router)
+router.include_router(admin_router)
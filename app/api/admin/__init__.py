@@ -0,0 +1,7 @@
+from fastapi import APIRouter
+
+from .routes import router
+
+admin_router = APIRouter()
+
+admin_router.include_router(router)
@@ -0,0 +1,139 @@
+import logging
+from typing import Annotated
+
+from api.auth.dependencies import require_user_roles
+from db import repositories
+from db.models.user import UserRole
+from db.session import db_helper
+from fastapi import APIRouter, Depends, HTTPException, status
+from messaging.replay import ReplayFilter, dead_letter_replayer
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.exceptions import ReplayInProgressError
+
+from .schemas import (
+    DeadLetterReplayRequest,
+    DeadLetterReplayStatus,
+    UserActiveUpdate,
+    UserRoleUpdate,
+    UserUpdateResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_user_roles(UserRole.admin))],
+)
+
+
+def _replay_status() -> DeadLetterReplayStatus:
+    progress = dead_letter_replayer.progress
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No replay has been started",
+        )
+    return DeadLetterReplayStatus(
+        running=dead_letter_replayer.running,
+        dry_run=progress.dry_run,
+        total=progress.total,
+        scanned=progress.scanned,
+        matched=progress.matched,
+        replayed=progress.replayed,
+        deleted=progress.deleted,
+        malformed=progress.malformed,
+        publish_errors=progress.publish_errors,
+        backpressure_waits=progress.backpressure_waits,
+        last_sequence=progress.last_sequence,
+        elapsed_seconds=progress.elapsed_seconds,
+        rate=progress.rate,
+        error=progress.error,
+    )
+
+
+# Проход идёт в фоне процесса, принявшего запрос: статус спрашивается у
+# того же экземпляра, для больших разборов удобнее CLI (replay_dlq.py)
+@router.post("/dead-letters/replay/", status_code=status.HTTP_202_ACCEPTED)
+async def start_dead_letter_replay(
+    request: DeadLetterReplayRequest,
+) -> DeadLetterReplayStatus:
+    try:
+        dead_letter_replayer.start(
+            ReplayFilter(error=request.error, since=request.since, until=request.until),
+            dry_run=request.dry_run,
+        )
+    except ReplayInProgressError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Replay is already running",
+        )
+    logger.info(f"Dead-letter replay started: {request.model_dump()}")
+    return _replay_status()
+
+
+@router.get("/dead-letters/replay/")
+async def get_dead_letter_replay() -> DeadLetterReplayStatus:
+    return _replay_status()
+
+
+@router.delete("/dead-letters/replay/", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_dead_letter_replay() -> None:
+    await dead_letter_replayer.stop()
+
+
+# Кэш пользователя инвалидируется, а выданные токены отзываются внутри
+# репозитория, поэтому изменения действуют со следующего запроса
+@router.post("/users/active/")
+async def set_user_active(
+    session: Annotated[AsyncSession, Depends(db_helper.get_session)],
+    update: UserActiveUpdate,
+) -> UserUpdateResponse:
+    try:
+        user_id = await repositories.set_user_active(
+            session=session, email=update.email, is_active=update.is_active
+        )
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while updating user activity: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while updating the user.",
+        )
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    state = "activated" if update.is_active else "deactivated"
+    logger.info(f"User {state}: ID={user_id}, Email={update.email}")
+    return UserUpdateResponse(
+        user_id=user_id, email=update.email, message=f"User {state}"
+    )
+
+
+@router.post("/users/role/")
+async def set_user_role(
+    session: Annotated[AsyncSession, Depends(db_helper.get_session)],
+    update: UserRoleUpdate,
+) -> UserUpdateResponse:
+    try:
+        user_id = await repositories.set_user_role(
+            session=session, email=update.email, role=update.role
+        )
+    except SQLAlchemyError as e:
+        logger.error(f"Database error while updating user role: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while updating the user.",
+        )
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    logger.info(
+        f"User role changed: ID={user_id}, Email={update.email}, "
+        f"Role={update.role.value}"
+    )
+    return UserUpdateResponse(
+        user_id=user_id, email=update.email, message=f"Role set to {update.role.value}"
+    )
@@ -0,0 +1,44 @@
+from uuid import UUID
+
+from db.models.user import UserRole
+from pydantic import AwareDatetime, BaseModel, EmailStr
+
+
+class DeadLetterReplayRequest(BaseModel):
+    error: str | None = None
+    since: AwareDatetime | None = None
+    until: AwareDatetime | None = None
+    dry_run: bool = False
+
+
+class DeadLetterReplayStatus(BaseModel):
+    running: bool
+    dry_run: bool
+    total: int
+    scanned: int
+    matched: int
+    replayed: int
+    deleted: int
+    malformed: int
+    publish_errors: int
+    backpressure_waits: int
+    last_sequence: int
+    elapsed_seconds: float
+    rate: float
+    error: str | None = None
+
+
+class UserActiveUpdate(BaseModel):
+    email: EmailStr
+    is_active: bool
+
+
+class UserRoleUpdate(BaseModel):
+    email: EmailStr
+    role: UserRole
+
+
+class UserUpdateResponse(BaseModel):
+    user_id: UUID
+    email: str
+    message: str
@@ -0,0 +1,77 @@
+"""Аутентификация только по claims токена, без обращения к БД.
+
+Деактивация и смена роли отзывают токены пользователя, поэтому
+stateless-проверка не пропускает устаревшие claims.
+"""
+
+from typing import Annotated, Callable, Coroutine
+
+from core.security import (
+    ACCESS_TOKEN,
+    PAYLOAD_KEY_SUB,
+    PAYLOAD_KEY_TOKEN_TYPE,
+    PAYLOAD_KEY_USER_ID,
+    PAYLOAD_KEY_USER_ROLE,
+)
+from db.models.user import UserRole
+from db.user_cache import UserIdentity
+from fastapi import Depends, HTTPException, status
+from pydantic import ValidationError
+
+from .schemas import TokenPrincipal
+from .service import get_current_active_auth_user, get_current_token_payload
+
+
+async def get_current_principal(
+    payload: Annotated[dict, Depends(get_current_token_payload)],
+) -> TokenPrincipal:
+    if payload.get(PAYLOAD_KEY_TOKEN_TYPE) != ACCESS_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token type",
+        )
+    try:
+        return TokenPrincipal(
+            user_id=payload[PAYLOAD_KEY_USER_ID],
+            email=payload[PAYLOAD_KEY_SUB],
+            role=payload[PAYLOAD_KEY_USER_ROLE],
+        )
+    except (KeyError, ValidationError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token claims",
+        )
+
+
+def require_roles(
+    *roles: UserRole,
+) -> Callable[..., Coroutine[None, None, TokenPrincipal]]:
+    async def dependency(
+        principal: Annotated[TokenPrincipal, Depends(get_current_principal)],
+    ) -> TokenPrincipal:
+        if principal.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions",
+            )
+        return principal
+
+    return dependency
+
+
+def require_user_roles(
+    *roles: UserRole,
+) -> Callable[..., Coroutine[None, None, UserIdentity]]:
+    """Как require_roles, но роль и активность берутся из БД (через кэш)."""
+
+    async def dependency(
+        user: Annotated[UserIdentity, Depends(get_current_active_auth_user)],
+    ) -> UserIdentity:
+        if user.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions",
+            )
+        return user
+
+    return dependency
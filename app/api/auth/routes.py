@@ -2,19 +2,21 @@ import logging
 import uuid
 from typing import Annotated
 
-from core.redis_client import RedisHelper
+from core.revocation import revocation_filter
 from core.security import (
-    PAYLOAD_KEY_SUB,
     PAYLOAD_KEY_TOKEN_TYPE,
+    PAYLOAD_KEY_USER_ID,
     REFRESH_TOKEN,
     create_access_token,
     create_refresh_token,
     decode_jwt,
-    serializer,
-    validate_password,
+    hash_password_async,
+    get_serializer,
+    password_policy,
+    validate_password_async,
 )
 from db import repositories
-from db.models import User
+from db.user_cache import UserIdentity
 from db.session import db_helper
 from fastapi import APIRouter, Cookie, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
@@ -22,10 +24,25 @@ from itsdangerous import BadSignature
 from jwt.exceptions import InvalidTokenError
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from utils.exceptions import PasswordHashingOverloadedError
 from utils.helpers import extract_jti
 
-from .schemas import RegisterResponse, TokenInfo, UserCreate
-from .service import get_current_active_auth_user, get_current_token_payload
+from .dependencies import get_current_principal
+from .schemas import (
+    IntrospectBatchRequest,
+    IntrospectBatchResponse,
+    RegisterResponse,
+    TokenInfo,
+    TokenPrincipal,
+    UserCreate,
+)
+from .service import (
+    check_login_rate_limit,
+    get_current_active_auth_user,
+    get_current_token_payload,
+    introspect_tokens,
+    require_introspection_client,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Auth"])
@@ -37,21 +54,25 @@ async def create_user(
     in_user: UserCreate,
 ) -> RegisterResponse:
     try:
+        # Хэш считается до первого запроса в сессии, т.е. до того,
+        # как из пула будет взято соединение
+        hashed_password = await hash_password_async(in_user.password)
         user = await repositories.create_user(
             session=session,
             email=in_user.email,
-            password=in_user.password,
+            hashed_password=hashed_password,
         )
         logger.info(
             f"User registered successfully: ID={user.id}, Email={in_user.email}"
         )
 
-        await repositories.save_confirmation_email_to_outbox(
-            session=session,
-            to_email=in_user.email,
-            message_id=str(user.id),
+    except PasswordHashingOverloadedError:
+        logger.warning("Password hashing pool is overloaded, registration rejected")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service is busy, try again later",
+            headers={"Retry-After": "1"},
         )
-
     except IntegrityError:
         logger.warning(f"Attempt to register with existing email: {in_user.email}")
         raise HTTPException(
@@ -71,7 +92,7 @@ async def create_user(
     )
 
 
-@router.post("/token/")
+@router.post("/token/", dependencies=[Depends(check_login_rate_limit)])
 async def login(
     response: Response,
     session: Annotated[AsyncSession, Depends(db_helper.get_session)],
@@ -84,8 +105,20 @@ async def login(
     email, password = form_data.username, form_data.password
     try:
         logger.info(f"Login attempt for email: {email}")
-        user = await repositories.get_user_by_email(session=session, email=email)
-        if not user or not validate_password(
+        # Соединения берутся только на время поиска и возвращаются в пул
+        # до проверки пароля; сессия для перехэширования пуста до записи
+        async with db_helper.read_session() as read_session:
+            user = await repositories.get_user_by_email(
+                session=read_session, email=email
+            )
+        if user is None:
+            # Только что зарегистрированный пользователь мог ещё не дойти
+            # до реплики
+            async with db_helper.session_factory() as primary_session:
+                user = await repositories.get_user_by_email(
+                    session=primary_session, email=email
+                )
+        if not user or not await validate_password_async(
             password=password,
             hashed_password=user.password,
         ):
@@ -100,6 +133,18 @@ async def login(
             )
         logger.info(f"User logged in successfully: {email}")
 
+        if password_policy.needs_rehash(user.password):
+            try:
+                await repositories.update_user_password(
+                    session=session,
+                    user_id=user.id,
+                    hashed_password=await hash_password_async(password),
+                )
+                logger.info(f"Password rehashed with updated cost for: {email}")
+            except (PasswordHashingOverloadedError, SQLAlchemyError) as e:
+                # Не мешаем входу, хэш обновится при следующем логине
+                logger.warning(f"Failed to rehash password for {email}: {e}")
+
         access_token = create_access_token(user)
         refresh_token = create_refresh_token(user)
         response.set_cookie(
@@ -110,6 +155,13 @@ async def login(
             samesite="lax",
         )
         return TokenInfo(access_token=access_token)
+    except PasswordHashingOverloadedError:
+        logger.warning(f"Password hashing pool is overloaded, login rejected: {email}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Service is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
     except Exception as e:
         logger.error(f"Error during login: {e}")
         raise
@@ -117,7 +169,6 @@ async def login(
 
 @router.post("/token/refresh/")
 async def refresh_token(
-    session: Annotated[AsyncSession, Depends(db_helper.get_session)],
     refresh_token: str = Cookie(None),
 ) -> TokenInfo:
     logger.info("Attempting to refresh token")
@@ -133,10 +184,22 @@ async def refresh_token(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token type",
             )
+        if await revocation_filter.is_token_revoked(payload):
+            raise InvalidTokenError
 
-        user = await repositories.get_user_by_email(
-            session=session, email=payload[PAYLOAD_KEY_SUB]
-        )
+        try:
+            user_id = uuid.UUID(payload[PAYLOAD_KEY_USER_ID])
+        except (KeyError, ValueError):
+            raise InvalidTokenError
+        async with db_helper.read_session() as read_session:
+            user = await repositories.get_user_by_id(
+                session=read_session, user_id=user_id
+            )
+        if user is None:
+            async with db_helper.session_factory() as session:
+                user = await repositories.get_user_by_id(
+                    session=session, user_id=user_id
+                )
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -160,8 +223,10 @@ async def logout(
     jti = extract_jti(token_payload)
     logger.info(f"Initiating logout for token JTI: {jti}")
     try:
-        async with RedisHelper() as redis:
-            await redis.add_token_to_blacklist(token_id=jti)  # type: ignore (проверка сделана в get_current_token_payload)
+        await revocation_filter.revoke(
+            token_id=jti,  # type: ignore (проверка сделана в get_current_token_payload)
+            expires_at=token_payload["exp"],
+        )
         logger.info(f"Token JTI {jti} successfully added to the blacklist")
     except Exception as e:
         logger.error(f"Failed to add token JTI {jti} to the blacklist: {e}")
@@ -176,12 +241,50 @@ async def logout(
     return None
 
 
+@router.post("/logout/all/", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_all(
+    response: Response,
+    token_payload: Annotated[dict, Depends(get_current_token_payload)],
+):
+    user_id = token_payload.get(PAYLOAD_KEY_USER_ID)
+    logger.info(f"Revoking all tokens for user ID: {user_id}")
+    try:
+        await revocation_filter.revoke_user(user_id=user_id)  # type: ignore
+    except Exception as e:
+        logger.error(f"Failed to revoke tokens for user ID {user_id}: {e}")
+        raise HTTPException(status_code=500, detail="Logout failed due to server error")
+    response.delete_cookie(
+        key="refresh_token",
+        httponly=True,
+        secure=True,
+        samesite="lax",
+    )
+    logger.info(f"All tokens revoked for user ID: {user_id}")
+    return None
+
+
+@router.post("/introspect/batch/")
+async def introspect_batch(
+    client_id: Annotated[str, Depends(require_introspection_client)],
+    in_batch: IntrospectBatchRequest,
+) -> IntrospectBatchResponse:
+    try:
+        results = await introspect_tokens(in_batch.tokens)
+    except Exception as e:
+        logger.error(f"Failed to introspect token batch for {client_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Introspection failed due to server error",
+        )
+    return IntrospectBatchResponse(results=results)
+
+
 @router.get("/register_confirm/", status_code=status.HTTP_200_OK)
 async def confirm_registration(
     session: Annotated[AsyncSession, Depends(db_helper.get_session)], token: str
 ) -> dict[str, str]:
     try:
-        email = serializer.loads(token)
+        email = get_serializer().loads(token)
     except BadSignature:
         raise HTTPException(status_code=400, detail="invalid token")
     try:
@@ -196,5 +299,12 @@ async def confirm_registration(
 
 
 @router.get("/test")
-async def test(user: Annotated[User, Depends(get_current_active_auth_user)]):
+async def test(user: Annotated[UserIdentity, Depends(get_current_active_auth_user)]):
     return user
+
+
+@router.get("/me/")
+async def me(
+    principal: Annotated[TokenPrincipal, Depends(get_current_principal)],
+) -> TokenPrincipal:
+    return principal
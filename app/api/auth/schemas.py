@@ -1,6 +1,9 @@
+from typing import Any
 from uuid import UUID
 
-from pydantic import BaseModel, EmailStr
+from core.config import settings
+from db.models.user import UserRole
+from pydantic import BaseModel, EmailStr, Field
 
 
 class UserCreate(BaseModel):
@@ -17,3 +20,25 @@ class RegisterResponse(BaseModel):
 class TokenInfo(BaseModel):
     access_token: str
     token_type: str = "bearer"
+
+
+class IntrospectBatchRequest(BaseModel):
+    tokens: list[str] = Field(
+        min_length=1,
+        max_length=settings.security.jwt.introspect_batch_max_size,
+    )
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    claims: dict[str, Any] | None = None
+
+
+class IntrospectBatchResponse(BaseModel):
+    results: list[TokenIntrospection]
+
+
+class TokenPrincipal(BaseModel):
+    user_id: UUID
+    email: str
+    role: UserRole
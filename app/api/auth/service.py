@@ -1,30 +1,58 @@
+import hmac
 import logging
+import uuid
 from typing import Annotated
 
-from core.redis_client import RedisHelper
-from core.security import (ACCESS_TOKEN, PAYLOAD_KEY_SUB,
-                           PAYLOAD_KEY_TOKEN_TYPE, decode_jwt)
+from core.config import settings
+from core.rate_limit import login_throttle
+from core.redis_client import RedisHelper, get_redis
+from core.revocation import revocation_filter
+from core.security import (ACCESS_TOKEN, PAYLOAD_KEY_TOKEN_TYPE,
+                           PAYLOAD_KEY_USER_ID, decode_jwt_cached)
 from db import repositories
-from db.models.user import User
+from db.user_cache import UserIdentity, user_cache
 from db.session import db_helper
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import (HTTPBasic, HTTPBasicCredentials,
+                              OAuth2PasswordBearer, OAuth2PasswordRequestForm)
 from jwt import InvalidTokenError
-from sqlalchemy.ext.asyncio import AsyncSession
-from utils.helpers import extract_jti
+
+from .schemas import TokenIntrospection
 
 logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token/")
+introspection_scheme = HTTPBasic(realm="introspection")
+
+
+async def check_login_rate_limit(
+    request: Request,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    redis: Annotated[RedisHelper, Depends(get_redis)],
+) -> None:
+    client_ip = request.client.host if request.client else "unknown"
+    retry_after = await login_throttle.check(
+        redis=redis,
+        email=form_data.username,
+        client_ip=client_ip,
+    )
+    if retry_after:
+        logger.warning(
+            f"Login rate limit exceeded for email: {form_data.username}, "
+            f"IP: {client_ip}"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(retry_after)},
+        )
 
 
 async def get_current_token_payload(token: Annotated[str, Depends(oauth2_scheme)]):
     try:
-        payload = decode_jwt(token=token)
-        jti = extract_jti(payload)
-        async with RedisHelper() as redis:
-            if jti is None or (await redis.is_blacklisted_token(jti)):
-                raise InvalidTokenError
+        payload = decode_jwt_cached(token=token)
+        if await revocation_filter.is_token_revoked(payload):
+            raise InvalidTokenError
 
     except InvalidTokenError:
         raise HTTPException(
@@ -41,16 +69,33 @@ async def get_current_token_payload(token: Annotated[str, Depends(oauth2_scheme)
 
 
 async def get_current_auth_user(
-    session: Annotated[AsyncSession, Depends(db_helper.get_session)],
     payload: Annotated[dict, Depends(get_current_token_payload)],
-) -> User:
+) -> UserIdentity:
     if payload.get(PAYLOAD_KEY_TOKEN_TYPE) != ACCESS_TOKEN:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token type",
         )
-    email = payload.get(PAYLOAD_KEY_SUB)
-    user = await repositories.get_user_by_email(session=session, email=email)  # type: ignore
+    try:
+        user_id = uuid.UUID(payload[PAYLOAD_KEY_USER_ID])
+    except (KeyError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token claims",
+        )
+    user = await user_cache.get(user_id)
+    if user is None:
+        # Соединение с БД нужно только при промахе кэша
+        async with db_helper.read_session() as read_session:
+            user = await repositories.get_user_identity(
+                session=read_session, user_id=user_id
+            )
+    if user is None:
+        # Реплика могла отстать от только что созданного пользователя
+        async with db_helper.session_factory() as session:
+            user = await repositories.get_user_identity(
+                session=session, user_id=user_id
+            )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,11 +105,55 @@ async def get_current_auth_user(
 
 
 async def get_current_active_auth_user(
-    user: Annotated[User, Depends(get_current_auth_user)],
-):
+    user: Annotated[UserIdentity, Depends(get_current_auth_user)],
+) -> UserIdentity:
     if user.is_active:
         return user
     raise HTTPException(
         status_code=status.HTTP_403_FORBIDDEN,
         detail="Inactive user",
     )
+
+
+def require_introspection_client(
+    credentials: Annotated[HTTPBasicCredentials, Depends(introspection_scheme)],
+) -> str:
+    """Интроспекция раскрывает claims, поэтому доступна только шлюзам и
+    сервисам из jwt.introspection_clients."""
+    secret = settings.security.jwt.introspection_clients.get(credentials.username)
+    if secret is None or not hmac.compare_digest(
+        credentials.password.encode(), secret.get_secret_value().encode()
+    ):
+        logger.warning(
+            f"Rejected introspection request from client: {credentials.username}"
+        )
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid client credentials",
+            headers={"WWW-Authenticate": 'Basic realm="introspection"'},
+        )
+    return credentials.username
+
+
+async def introspect_tokens(tokens: list[str]) -> list[TokenIntrospection]:
+    inactive = TokenIntrospection(active=False)
+    results = [inactive] * len(tokens)
+    verified: list[tuple[int, dict]] = []
+    for index, token in enumerate(tokens):
+        try:
+            payload = decode_jwt_cached(token=token)
+        except InvalidTokenError:
+            continue
+        # Refresh-токен ресурсным серверам не предъявляют
+        if payload.get(PAYLOAD_KEY_TOKEN_TYPE) == ACCESS_TOKEN:
+            verified.append((index, payload))
+
+    if verified:
+        # Возможные совпадения проверяются в Redis одним round trip
+        revoked = await revocation_filter.get_revoked(
+            [payload for _, payload in verified]
+        )
+        for (index, payload), is_revoked in zip(verified, revoked):
+            if not is_revoked:
+                results[index] = TokenIntrospection(active=True, claims=payload)
+    return results
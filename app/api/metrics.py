@@ -0,0 +1,222 @@
+from core.config import settings
+from core.metrics import NAMESPACE, MetricsWriter
+from core.rate_limit import login_throttle
+from core.redis_client import redis_helper
+from core.revocation import revocation_filter
+from core.security import password_hashing_pool, verified_token_cache
+from core.startup import startup_stats
+from db.pool import InstrumentedAsyncQueuePool
+from db.session import db_helper
+from db.user_cache import user_cache
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from messaging.metrics import write_consumer_metrics
+
+router = APIRouter()
+
+
+def _database_pools() -> list[tuple[str, InstrumentedAsyncQueuePool]]:
+    pools = [("primary", db_helper.engine.pool)]
+    for replica in db_helper.replicas:
+        url = replica.engine.url
+        pools.append((f"replica:{url.host}:{url.port}", replica.engine.pool))
+    return [
+        (name, pool)
+        for name, pool in pools
+        if isinstance(pool, InstrumentedAsyncQueuePool)
+    ]
+
+
+def write_database_metrics(metrics: MetricsWriter) -> None:
+    pools = _database_pools()
+    for name, pool in pools:
+        metrics.gauge(
+            "db_pool_size", "Configured pool size", pool.size(), {"pool": name}
+        )
+    for name, pool in pools:
+        metrics.gauge(
+            "db_pool_checked_out",
+            "Connections currently checked out",
+            pool.checkedout(),
+            {"pool": name},
+        )
+    for name, pool in pools:
+        metrics.gauge(
+            "db_pool_overflow",
+            "Connections open beyond pool_size (negative while below it)",
+            pool.overflow(),
+            {"pool": name},
+        )
+    for name, pool in pools:
+        metrics.counter(
+            "db_pool_checkouts",
+            "Connection checkouts",
+            pool.stats.checkouts,
+            {"pool": name},
+        )
+    for name, pool in pools:
+        metrics.counter(
+            "db_pool_overflow_checkouts",
+            "Checkouts made while the pool was in overflow",
+            pool.stats.overflow_checkouts,
+            {"pool": name},
+        )
+    for name, pool in pools:
+        metrics.counter(
+            "db_pool_timeouts",
+            "Checkouts that timed out waiting for a connection",
+            pool.stats.timeouts,
+            {"pool": name},
+        )
+    for name, pool in pools:
+        metrics.histogram(
+            "db_pool_checkout_wait_seconds",
+            "Time spent waiting for a connection",
+            pool.stats.wait,
+            {"pool": name},
+        )
+    for name, pool in pools:
+        for route, histogram in sorted(pool.stats.hold.items()):
+            metrics.histogram(
+                "db_pool_hold_seconds",
+                "Time a connection stayed checked out, by route",
+                histogram,
+                {"pool": name, "route": route},
+            )
+
+    routing = db_helper.stats
+    metrics.counter(
+        "db_read_replica_sessions",
+        "Read sessions served by a replica",
+        routing.replica_sessions,
+    )
+    metrics.counter(
+        "db_read_primary_fallbacks",
+        "Read sessions that fell back to the primary",
+        routing.primary_fallbacks,
+    )
+    metrics.counter(
+        "db_read_replica_errors",
+        "Failed connection attempts to replicas",
+        routing.replica_errors,
+    )
+
+
+def write_redis_metrics(metrics: MetricsWriter) -> None:
+    stats = redis_helper.stats()
+    metrics.gauge(
+        "redis_pool_max_connections", "Redis pool limit", stats.max_connections
+    )
+    metrics.gauge("redis_pool_in_use", "Redis connections in use", stats.in_use)
+    metrics.gauge(
+        "redis_pool_available", "Idle Redis connections in the pool", stats.available
+    )
+
+
+def write_security_metrics(metrics: MetricsWriter) -> None:
+    hashing = password_hashing_pool.stats()
+    metrics.gauge("hashing_workers", "Password hashing threads", hashing.workers)
+    metrics.gauge(
+        "hashing_queue_depth", "Hashing jobs waiting for a thread", hashing.queue_depth
+    )
+    metrics.gauge(
+        "hashing_in_progress", "Hashing jobs running now", hashing.in_progress
+    )
+    metrics.counter("hashing_completed", "Completed hashing jobs", hashing.completed)
+    metrics.counter(
+        "hashing_rejected", "Hashing jobs rejected on overload", hashing.rejected
+    )
+    metrics.gauge(
+        "hashing_max_wait_seconds",
+        "Longest queue wait of a hashing job",
+        hashing.max_wait_ms / 1000,
+    )
+
+    caches = (
+        ("token", verified_token_cache.stats()),
+        ("user", user_cache.local.stats()),
+    )
+    for name, stats in caches:
+        metrics.gauge("cache_size", "Entries in the cache", stats.size, {"cache": name})
+    for name, stats in caches:
+        metrics.counter("cache_hits", "Cache hits", stats.hits, {"cache": name})
+    for name, stats in caches:
+        metrics.counter("cache_misses", "Cache misses", stats.misses, {"cache": name})
+    for name, stats in caches:
+        metrics.counter(
+            "cache_evictions", "LRU evictions", stats.evictions, {"cache": name}
+        )
+
+    throttle = login_throttle.stats
+    for result, value in (
+        ("allowed", throttle.allowed),
+        ("blocked_account", throttle.blocked_account),
+        ("blocked_ip", throttle.blocked_ip),
+        ("error", throttle.errors),
+    ):
+        metrics.counter(
+            "login_throttle_checks",
+            "Login throttle decisions",
+            value,
+            {"result": result},
+        )
+
+    revocation = revocation_filter.stats
+    metrics.gauge(
+        "revocation_filter_ready",
+        "Whether the local revocation filter is in sync",
+        revocation_filter.ready,
+    )
+    metrics.gauge(
+        "revocation_filter_tokens",
+        "Revoked jti held locally (Bloom filter estimate)",
+        revocation.size,
+    )
+    metrics.gauge(
+        "revocation_filter_bytes",
+        "Memory of the local Bloom filters",
+        revocation.filter_bytes,
+    )
+    metrics.gauge(
+        "revocation_filter_users",
+        "User revocation marks held locally",
+        revocation.users,
+    )
+    metrics.counter(
+        "revocation_local_negatives",
+        "Revocation checks answered locally",
+        revocation.local_negatives,
+    )
+    metrics.counter(
+        "revocation_redis_checks",
+        "Revocation checks sent to Redis",
+        revocation.redis_checks,
+    )
+    metrics.counter("revocation_resyncs", "Full reloads from Redis", revocation.resyncs)
+
+
+def write_startup_metrics(metrics: MetricsWriter) -> None:
+    metrics.gauge(
+        "startup_import_seconds",
+        "Time from process start to application modules imported",
+        startup_stats.import_seconds,
+    )
+    metrics.gauge(
+        "startup_ready_seconds",
+        "Time from process start (fork for prefork workers) to lifespan startup complete",
+        startup_stats.ready_seconds,
+    )
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> PlainTextResponse:
+    writer = MetricsWriter(namespace=NAMESPACE)
+    write_database_metrics(writer)
+    write_redis_metrics(writer)
+    write_security_metrics(writer)
+    # При выключенном подписчике письма шлёт worker.py и отдаёт эти
+    # метрики сам, а здесь они были бы вечными нулями
+    if settings.email_worker.api_subscriber_enabled:
+        write_consumer_metrics(writer)
+    write_startup_metrics(writer)
+    return PlainTextResponse(writer.render(), media_type=MetricsWriter.CONTENT_TYPE)
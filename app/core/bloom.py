@@ -0,0 +1,80 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Фильтр Блума, растущий слоями.
+
+    Отвечает «точно нет» или «возможно да»: ложных отрицаний нет, доля
+    ложных срабатываний не больше error_rate. Первый слой рассчитан на
+    capacity элементов; когда он заполнен, добавляется слой вдвое больше
+    со вдвое меньшей долей ошибок, так что общая доля остаётся в пределах
+    error_rate. Проверка обходит все слои, поэтому capacity лучше знать
+    заранее: один слой при 1% — около 1.2 байта на элемент. Удаления нет:
+    устаревшие элементы выбрасываются вместе с фильтром, а len — оценка
+    снизу, повторы и ложные срабатывания при добавлении не считаются.
+
+    Рассчитан на использование из одного event loop, блокировок нет.
+    """
+
+    def __init__(self, capacity: int = 1024, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # (биты, число бит, число хэшей, ёмкость слоя)
+        self._layers: list[tuple[bytearray, int, int, int]] = []
+        self._count = 0
+        self._layer_count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, item: str) -> bool:
+        h1, h2 = self._hashes(item)
+        return any(
+            self._test(bits, size, hashes, h1, h2)
+            for bits, size, hashes, _ in self._layers
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(bits) for bits, _, _, _ in self._layers)
+
+    def add(self, item: str) -> None:
+        h1, h2 = self._hashes(item)
+        if any(
+            self._test(bits, size, hashes, h1, h2)
+            for bits, size, hashes, _ in self._layers
+        ):
+            return
+        if not self._layers or self._layer_count >= self._layers[-1][3]:
+            self._add_layer()
+        bits, size, hashes, _ = self._layers[-1]
+        for i in range(hashes):
+            position = (h1 + i * h2) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self._layer_count += 1
+        self._count += 1
+
+    def _add_layer(self) -> None:
+        index = len(self._layers)
+        capacity = self.capacity << index
+        # Сумма ряда error_rate / 2, / 4, ... не превышает error_rate
+        error_rate = self.error_rate / 2 ** (index + 1)
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        hashes = max(1, round(size / capacity * math.log(2)))
+        self._layers.append((bytearray((size + 7) // 8), size, hashes, capacity))
+        self._layer_count = 0
+
+    @staticmethod
+    def _hashes(item: str) -> tuple[int, int]:
+        # Двойное хэширование: k позиций из двух 64-битных значений
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        return int.from_bytes(digest[:8]), int.from_bytes(digest[8:]) | 1
+
+    @staticmethod
+    def _test(bits: bytearray, size: int, hashes: int, h1: int, h2: int) -> bool:
+        for i in range(hashes):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
@@ -1,4 +1,6 @@
+from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseModel, NatsDsn, PostgresDsn, SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -7,15 +9,73 @@ BASE_DIR = Path(__file__).parent.parent.parent
 
 
 class JWTConfig(BaseModel):
+    # Алгоритм подписи; для RSA-ключа используется он, для EC и Ed25519
+    # алгоритм определяется типом ключа (ES256 / EdDSA)
     algorithm: str = "RS256"
+    # Алгоритмы, принимаемые при проверке. Во время миграции сюда
+    # добавляется и старый, и новый алгоритм. По умолчанию — алгоритмы
+    # загруженных ключей, определённые по их типу
+    accepted_algorithms: list[str] = []
     access_token_expire_minutes: int = 15
     refresh_token_expire_days: int = 30
+    introspect_batch_max_size: int = 100
+    # client_id -> секрет для HTTP Basic на /auth/introspect/batch/.
+    # Пока клиентов нет, интроспекция закрыта для всех
+    introspection_clients: dict[str, SecretStr] = {}
+
+
+class PasswordConfig(BaseModel):
+    hash_workers: int = 4
+    hash_queue_size: int = 64
+    # Если не задано, cost подбирается при старте под target_hash_ms
+    bcrypt_rounds: int | None = None
+    target_hash_ms: int = 250
+    min_bcrypt_rounds: int = 10
+    max_bcrypt_rounds: int = 16
+
+
+class TokenCacheConfig(BaseModel):
+    max_size: int = 10_000
+    ttl_seconds: int = 300
+
+
+class LoginThrottleConfig(BaseModel):
+    enabled: bool = True
+    account_limit: int = 10
+    account_window_seconds: int = 5 * 60
+    ip_limit: int = 50
+    ip_window_seconds: int = 60
+
+
+class RevocationConfig(BaseModel):
+    # Локальный фильтр отозванных jti, синхронизируемый через pub/sub
+    local_filter_enabled: bool = True
+    # Доля проверок, которые фильтр Блума зря отправит в Redis
+    local_filter_error_rate: float = 0.01
+    channel: str = "revocations"
+    users_channel: str = "revocations:users"
+    # Ширина корзины чёрного списка по времени истечения токена
+    blacklist_bucket_seconds: int = 5 * 60
+    # На сколько хэшей делится корзина. Хэш хранится компактно (listpack),
+    # пока в нём не больше hash-max-listpack-entries полей (128 по
+    # умолчанию), иначе Redis переводит его в hashtable. В хэше в среднем
+    # отозвано_за_время_жизни * bucket_seconds / время_жизни / shards
+    # полей: 10M отзывов refresh-токенов за 30 дней — ~1200 на корзину,
+    # 16 хэшей по ~75. Для плотных отзывов короткоживущих токенов нужно
+    # больше хэшей или уже корзины (benchmarks/bench_blacklist_memory.py)
+    blacklist_bucket_shards: int = 16
 
 
 class SecurityConfig(BaseModel):
     private_key: Path = BASE_DIR / "app" / "core" / "certs" / "private_key.pem"
     public_key: Path = BASE_DIR / "app" / "core" / "certs" / "public_key.pem"
+    # Дополнительные ключи проверки, например предыдущий ключ после ротации
+    extra_public_keys: list[Path] = []
     jwt: JWTConfig = JWTConfig()
+    password: PasswordConfig = PasswordConfig()
+    token_cache: TokenCacheConfig = TokenCacheConfig()
+    login_throttle: LoginThrottleConfig = LoginThrottleConfig()
+    revocation: RevocationConfig = RevocationConfig()
 
 
 class DatabaseConfig(BaseModel):
@@ -23,6 +83,15 @@ class DatabaseConfig(BaseModel):
     echo: bool
     pool_size: int
     max_overflow: int
+    # Сколько секунд ждать свободное соединение до TimeoutError
+    pool_timeout: float = 30.0
+    # Prepared statements asyncpg, кэшируемые на каждом соединении
+    prepared_statement_cache_size: int = 500
+    # Реплики для чтения; пустой список — всё идёт в primary
+    replica_urls: list[PostgresDsn] = []
+    replica_strategy: Literal["round_robin", "least_connections"] = "round_robin"
+    # Сколько секунд не обращаться к реплике после ошибки соединения
+    replica_retry_seconds: float = 5.0
     naming_convention: dict = {
         "ix": "ix_%(column_0_label)s",
         "uq": "uq_%(table_name)s_%(column_0_name)s",
@@ -36,7 +105,11 @@ class RedisConfig(BaseModel):
     host: str
     port: int
     db: int
-    max_connections: int = 10
+    # На воркер: с запасом на одновременные запросы, каждый держит
+    # соединение на время одной команды или пайплайна
+    max_connections: int = 50
+    # Сколько ждать свободное соединение, прежде чем ответить ошибкой
+    pool_timeout: float = 5.0
 
 
 class NatsConfig(BaseModel):
@@ -49,6 +122,92 @@ class SMTPConfig(BaseModel):
     port: int
     username: str
     password: SecretStr
+    # TLS с самого начала (465) либо STARTTLS (587); для локального
+    # aiosmtpd оба выключаются, как и auth
+    use_tls: bool = True
+    start_tls: bool | None = None
+    auth: bool = True
+    timeout_seconds: float = 30.0
+    # Не больше pool_size одновременных SMTP-сессий
+    pool_size: int = 10
+    pool_idle_timeout_seconds: float = 60.0
+    pool_health_check_seconds: float = 10.0
+    max_messages_per_connection: int = 100
+
+
+class OutboxConfig(BaseModel):
+    batch_size: int = 100
+    # Страховочный опрос на случай потерянного NOTIFY
+    poll_interval_seconds: float = 5.0
+    # Канал совпадает с триггером в миграции outbox_notify
+    notify_channel: str = "outbox_pending"
+    subject: str = "email.send"
+    publish_timeout_seconds: float = 5.0
+    # Отправленные записи старше retention_seconds удаляются пачками
+    retention_enabled: bool = True
+    retention_seconds: int = 7 * 24 * 60 * 60
+    retention_batch_size: int = 1000
+    retention_interval_seconds: int = 60
+    # Переносить записи в outbox_archive вместо удаления
+    archive: bool = False
+
+
+class EmailRetryConfig(BaseModel):
+    # Доставка с этим номером, завершившаяся временной ошибкой, уходит в DLQ
+    max_attempts: int = 5
+    backoff_base_seconds: float = 5.0
+    backoff_multiplier: float = 2.0
+    backoff_max_seconds: float = 5 * 60
+    # Доля случайного разброса задержки, чтобы повторы не шли волной
+    jitter: float = 0.2
+
+
+class EmailWorkerConfig(BaseModel):
+    # Подписчик email.send внутри API; выключается, когда письма
+    # отправляет отдельный worker.py
+    api_subscriber_enabled: bool = True
+    durable: str = "email-workers"
+    batch_size: int = 10
+    fetch_timeout_seconds: float = 5.0
+    # Одновременных писем на процесс; больше smtp.pool_size не имеет смысла
+    concurrency: int = 10
+    # HTTP /metrics процесса worker.py для Prometheus
+    metrics_host: str = "0.0.0.0"
+    metrics_port: int = 9100
+    retry: EmailRetryConfig = EmailRetryConfig()
+
+
+class DeadLetterReplayConfig(BaseModel):
+    subject: str = "email.send"
+    batch_size: int = 100
+    # Темп повторной отправки: после сбоя SMTP нельзя сразу завалить релей
+    rate_per_second: float = 50.0
+    fetch_timeout_seconds: float = 2.0
+    publish_timeout_seconds: float = 5.0
+    # Пауза, пока в email-stream нет места под следующую пачку
+    backpressure_poll_seconds: float = 1.0
+    delete_replayed: bool = True
+
+
+class ServerConfig(BaseModel):
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # Если не задано — по числу CPU
+    workers: int | None = None
+    # auto выбирает uvloop и httptools, если они установлены
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: Literal["auto", "h11", "httptools"] = "auto"
+    backlog: int = 2048
+    timeout_graceful_shutdown: int = 30
+
+
+class UserCacheConfig(BaseModel):
+    local_max_size: int = 10_000
+    local_ttl_seconds: int = 5
+    redis_ttl_seconds: int = 60
+    # Сколько после инвалидации не записывать в кэш прочитанное из БД:
+    # отстающая реплика ещё может отдать старую строку
+    replica_lag_seconds: int = 5
 
 
 class Settings(BaseSettings):
@@ -65,10 +224,24 @@ class Settings(BaseSettings):
     nats: NatsConfig
     smtp: SMTPConfig
     security: SecurityConfig = SecurityConfig()
+    user_cache: UserCacheConfig = UserCacheConfig()
+    outbox: OutboxConfig = OutboxConfig()
+    email_worker: EmailWorkerConfig = EmailWorkerConfig()
+    dead_letter_replay: DeadLetterReplayConfig = DeadLetterReplayConfig()
+    server: ServerConfig = ServerConfig()
     frontend_url: str
 
 
-settings = Settings()  # type: ignore
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()  # type: ignore
 
 
-print(settings.frontend_url)
+def __getattr__(name: str):
+    # Settings() создаётся при первом обращении к settings, а не при импорте
+    # core.config: модулям, которым нужны только классы конфигов (retry.py,
+    # бенчмарки), .env не нужен. Модули приложения обращаются к settings
+    # при своём импорте — один раз, в serve.py до fork
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
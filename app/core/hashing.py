@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, TypeVar
+
+import bcrypt
+from utils.exceptions import PasswordHashingOverloadedError
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class HashingPoolStats:
+    workers: int
+    queue_size: int
+    queue_depth: int
+    in_progress: int
+    completed: int
+    rejected: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class PasswordHashingPool:
+    """Выполняет bcrypt в отдельном пуле потоков, не блокируя event loop.
+
+    bcrypt отпускает GIL на время хэширования, поэтому потоков достаточно.
+    Очередь ограничена: при переполнении задача отклоняется сразу,
+    а не копится в памяти executor'а.
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int) -> None:
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="password-hash",
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._queued >= self.max_queue_size:
+                self._rejected += 1
+                raise PasswordHashingOverloadedError
+            self._queued += 1
+
+        submitted_at = time.perf_counter()
+        try:
+            future = self._executor.submit(self._call, submitted_at, func, args)
+        except BaseException:
+            self._release_slot()
+            raise
+        future.add_done_callback(self._release_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self._queued -= 1
+
+    def _release_cancelled(self, future: Future) -> None:
+        # Отмена ожидающего запроса отменяет задачу, только если она ещё
+        # в очереди: до _call она не дошла, и место освобождается здесь
+        if future.cancelled():
+            self._release_slot()
+
+    def _call(self, submitted_at: float, func: Callable[..., T], args: tuple) -> T:
+        wait = time.perf_counter() - submitted_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    def stats(self) -> HashingPoolStats:
+        with self._lock:
+            started = self._completed + self._running
+            avg_wait = self._total_wait / started if started else 0.0
+            return HashingPoolStats(
+                workers=self.max_workers,
+                queue_size=self.max_queue_size,
+                queue_depth=self._queued,
+                in_progress=self._running,
+                completed=self._completed,
+                rejected=self._rejected,
+                avg_wait_ms=avg_wait * 1000,
+                max_wait_ms=self._max_wait * 1000,
+            )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def bcrypt_rounds(hashed_password: bytes) -> int:
+    # Формат хэша: $2b$<cost>$<salt+hash>
+    return int(hashed_password.split(b"$")[2])
+
+
+def calibrate_bcrypt_rounds(target_ms: int, min_rounds: int, max_rounds: int) -> int:
+    """Подбирает наибольший cost, при котором хэширование укладывается в target_ms.
+
+    Каждый следующий cost вдвое дороже предыдущего, поэтому достаточно
+    замерить минимальный и экстраполировать.
+    """
+    salt = bcrypt.gensalt(rounds=min_rounds)
+    elapsed = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration", salt)
+        elapsed = min(elapsed, (time.perf_counter() - start) * 1000)
+
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed * 2 <= target_ms:
+        rounds += 1
+        elapsed *= 2
+    return rounds
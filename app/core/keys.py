@@ -0,0 +1,189 @@
+import argparse
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from cryptography.hazmat.primitives.asymmetric.types import (
+    PrivateKeyTypes,
+    PublicKeyTypes,
+)
+from jwt import InvalidTokenError
+
+RSA_ALGORITHMS = ("RS256", "RS384", "RS512", "PS256", "PS384", "PS512")
+EC_ALGORITHMS = {
+    "ES256": ec.SECP256R1,
+    "ES384": ec.SECP384R1,
+    "ES512": ec.SECP521R1,
+}
+SUPPORTED_ALGORITHMS = (*RSA_ALGORITHMS, *EC_ALGORITHMS, "EdDSA")
+
+
+def generate_private_key(algorithm: str) -> PrivateKeyTypes:
+    if algorithm in RSA_ALGORITHMS:
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    if algorithm in EC_ALGORITHMS:
+        return ec.generate_private_key(EC_ALGORITHMS[algorithm]())
+    if algorithm == "EdDSA":
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+
+@dataclass(frozen=True, slots=True)
+class SigningKey:
+    kid: str
+    private_key: PrivateKeyTypes
+    algorithm: str
+
+
+@dataclass(frozen=True, slots=True)
+class VerificationKey:
+    public_key: PublicKeyTypes
+    algorithm: str
+
+
+class KeyRing:
+    """Разобранные ключи подписи и проверки JWT.
+
+    PEM читается и парсится один раз при добавлении ключа, дальше PyJWT
+    получает готовые объекты cryptography. Ключи проверки выбираются по
+    заголовку kid, поэтому при ротации старые токены остаются валидными,
+    пока их ключ не удалён из кольца. Новый ключ подписи заменяет прежний,
+    а прежний остаётся ключом проверки. Алгоритм определяется типом
+    ключа, принимаются только алгоритмы из accepted_algorithms, а если
+    он не задан — алгоритмы ключей, добавленных в кольцо.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        accepted_algorithms: list[str] | None = None,
+    ) -> None:
+        self.algorithm = algorithm
+        # Пустой список — принимаются алгоритмы загруженных ключей
+        self.accepted_algorithms = set(accepted_algorithms or [])
+        self._derive_accepted = not accepted_algorithms
+        self._lock = threading.Lock()
+        self._signing_key: SigningKey | None = None
+        # Копируется при каждом изменении, чтение идёт без блокировки
+        self._verification_keys: dict[str, VerificationKey] = {}
+        self._default_kid: str | None = None
+
+    @staticmethod
+    def key_id(public_key: PublicKeyTypes) -> str:
+        der = public_key.public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        return hashlib.sha256(der).hexdigest()[:16]
+
+    def algorithm_for_key(self, key: PrivateKeyTypes | PublicKeyTypes) -> str:
+        if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+            return self.algorithm if self.algorithm in RSA_ALGORITHMS else "RS256"
+        if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+            return "EdDSA"
+        if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+            for algorithm, curve in EC_ALGORITHMS.items():
+                if isinstance(key.curve, curve):
+                    return algorithm
+        raise ValueError(f"Unsupported key type: {type(key).__name__}")
+
+    @property
+    def signing_key(self) -> SigningKey:
+        if self._signing_key is None:
+            raise RuntimeError("Signing key is not loaded")
+        return self._signing_key
+
+    @property
+    def kids(self) -> list[str]:
+        return list(self._verification_keys)
+
+    def add_signing_key(self, private_key: PrivateKeyTypes) -> str:
+        algorithm = self.algorithm_for_key(private_key)
+        if not self._derive_accepted and algorithm not in self.accepted_algorithms:
+            raise ValueError(
+                f"Signing key algorithm {algorithm} is not in accepted_algorithms "
+                f"{sorted(self.accepted_algorithms)}"
+            )
+        kid = self.add_verification_key(private_key.public_key())
+        with self._lock:
+            self._signing_key = SigningKey(
+                kid=kid, private_key=private_key, algorithm=algorithm
+            )
+            self._default_kid = kid
+        return kid
+
+    def add_verification_key(self, public_key: PublicKeyTypes) -> str:
+        kid = self.key_id(public_key)
+        key = VerificationKey(
+            public_key=public_key,
+            algorithm=self.algorithm_for_key(public_key),
+        )
+        with self._lock:
+            if self._derive_accepted:
+                self.accepted_algorithms.add(key.algorithm)
+            keys = dict(self._verification_keys)
+            keys[kid] = key
+            self._verification_keys = keys
+        return kid
+
+    def remove_verification_key(self, kid: str) -> None:
+        with self._lock:
+            if self._signing_key is not None and self._signing_key.kid == kid:
+                raise ValueError("Cannot remove the active signing key")
+            keys = dict(self._verification_keys)
+            keys.pop(kid, None)
+            self._verification_keys = keys
+            if self._default_kid == kid:
+                self._default_kid = None
+
+    def load_signing_key(self, path: Path, password: bytes | None = None) -> str:
+        return self.load_signing_pem(path.read_bytes(), password=password)
+
+    def load_signing_pem(self, pem: bytes, password: bytes | None = None) -> str:
+        private_key = serialization.load_pem_private_key(pem, password=password)
+        return self.add_signing_key(private_key)
+
+    def load_verification_key(self, path: Path) -> str:
+        public_key = serialization.load_pem_public_key(path.read_bytes())
+        return self.add_verification_key(public_key)
+
+    def verification_key(self, kid: str | None) -> VerificationKey:
+        # Токены без kid проверяются текущим ключом подписи
+        if kid is None:
+            kid = self._default_kid
+        key = self._verification_keys.get(kid) if kid else None
+        if key is None:
+            raise InvalidTokenError("Unknown signing key")
+        if key.algorithm not in self.accepted_algorithms:
+            raise InvalidTokenError(f"Algorithm {key.algorithm} is not accepted")
+        return key
+
+
+def write_key_pair(algorithm: str, out_dir: Path) -> None:
+    private_key = generate_private_key(algorithm)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / "private_key.pem").write_bytes(
+        private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+    )
+    (out_dir / "public_key.pem").write_bytes(
+        private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a JWT signing key pair")
+    parser.add_argument("--algorithm", choices=SUPPORTED_ALGORITHMS, default="EdDSA")
+    parser.add_argument("--out-dir", type=Path, default=Path(__file__).parent / "certs")
+    args = parser.parse_args()
+    write_key_pair(args.algorithm, args.out_dir)
+    print(f"{args.algorithm} key pair written to {args.out_dir}")
@@ -1,7 +1,7 @@
 from email.message import EmailMessage
 
-import aiosmtplib
 from core.config import settings
+from core.smtp_pool import smtp_pool
 
 
 async def send_confirmation_email(to_email: str, token: str):
@@ -15,11 +15,4 @@ async def send_confirmation_email(to_email: str, token: str):
     message["To"] = to_email
     message["Subject"] = "Подтверждение регистрации"
 
-    await aiosmtplib.send(
-        message,
-        hostname=settings.smtp.host,
-        port=settings.smtp.port,
-        username=settings.smtp.username,
-        password=settings.smtp.password.get_secret_value(),
-        use_tls=True,
-    )
+    await smtp_pool.send_message(message)
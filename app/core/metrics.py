@@ -0,0 +1,131 @@
+import bisect
+import math
+from dataclasses import dataclass, field
+
+# Общий префикс метрик API и воркеров
+NAMESPACE = "auth"
+
+# Границы корзин в секундах: от долей миллисекунды до таймаута пула
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+@dataclass(slots=True)
+class Histogram:
+    """Гистограмма в духе Prometheus: счётчики по верхним границам корзин."""
+
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if isinstance(value, bool):
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return "{" + pairs + "}"
+
+
+class MetricsWriter:
+    """Собирает текстовый формат экспозиции Prometheus (version 0.0.4).
+
+    HELP и TYPE пишутся при первом обращении к семейству, поэтому строки
+    одного семейства с разными метками нужно добавлять подряд.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, namespace: str = "") -> None:
+        self.namespace = namespace
+        self._lines: list[str] = []
+        self._declared: set[str] = set()
+
+    def _declare(self, name: str, kind: str, help_text: str) -> str:
+        full_name = f"{self.namespace}_{name}" if self.namespace else name
+        if full_name not in self._declared:
+            self._declared.add(full_name)
+            self._lines.append(f"# HELP {full_name} {help_text}")
+            self._lines.append(f"# TYPE {full_name} {kind}")
+        return full_name
+
+    def _sample(self, name: str, value: float, labels: dict[str, str]) -> None:
+        self._lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def counter(
+        self,
+        name: str,
+        help_text: str,
+        value: float,
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        full_name = self._declare(f"{name}_total", "counter", help_text)
+        self._sample(full_name, value, labels or {})
+
+    def gauge(
+        self,
+        name: str,
+        help_text: str,
+        value: float,
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        full_name = self._declare(name, "gauge", help_text)
+        self._sample(full_name, value, labels or {})
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        histogram: Histogram,
+        labels: dict[str, str] | None = None,
+    ) -> None:
+        full_name = self._declare(name, "histogram", help_text)
+        labels = labels or {}
+        cumulative = 0
+        for bound, count in zip((*histogram.buckets, math.inf), histogram.counts):
+            cumulative += count
+            self._sample(
+                f"{full_name}_bucket",
+                cumulative,
+                {**labels, "le": _format_value(bound)},
+            )
+        self._sample(f"{full_name}_sum", histogram.sum, labels)
+        self._sample(f"{full_name}_count", histogram.count, labels)
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
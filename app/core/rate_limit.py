@@ -0,0 +1,60 @@
+import logging
+import math
+from dataclasses import dataclass
+
+from .config import LoginThrottleConfig, settings
+from .redis_client import RedisHelper
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class LoginThrottleStats:
+    allowed: int = 0
+    blocked_account: int = 0
+    blocked_ip: int = 0
+    errors: int = 0
+
+
+class LoginThrottle:
+    """Ограничение попыток входа по аккаунту и по IP до проверки пароля."""
+
+    def __init__(self, config: LoginThrottleConfig) -> None:
+        self.config = config
+        self.stats = LoginThrottleStats()
+
+    async def check(self, redis: RedisHelper, email: str, client_ip: str) -> int:
+        """Возвращает 0, если попытка разрешена, иначе Retry-After в секундах."""
+        if not self.config.enabled:
+            return 0
+        windows = [
+            (
+                f"login:account:{email.lower()}",
+                self.config.account_window_seconds * 1000,
+                self.config.account_limit,
+            ),
+            (
+                f"login:ip:{client_ip}",
+                self.config.ip_window_seconds * 1000,
+                self.config.ip_limit,
+            ),
+        ]
+        try:
+            exceeded, retry_after_ms = await redis.hit_sliding_windows(windows)
+        except Exception as e:
+            # Недоступность Redis не должна блокировать вход
+            self.stats.errors += 1
+            logger.warning(f"Login throttle check failed, allowing attempt: {e}")
+            return 0
+
+        if exceeded == 0:
+            self.stats.allowed += 1
+            return 0
+        if exceeded == 1:
+            self.stats.blocked_account += 1
+        else:
+            self.stats.blocked_ip += 1
+        return max(1, math.ceil(retry_after_ms / 1000))
+
+
+login_throttle = LoginThrottle(settings.security.login_throttle)
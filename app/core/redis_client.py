@@ -1,10 +1,93 @@
-from typing import Self
+import base64
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import AsyncIterator, Self
 
 import redis.asyncio as redis
 from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline, PubSub
+from redis.commands.core import AsyncScript
 
 from .config import settings
 
+BLACKLIST_PREFIX = "blacklist:"
+REVOKED_BEFORE_PREFIX = "revoked_before:"
+BLACKLIST_BUCKET_SECONDS = settings.security.revocation.blacklist_bucket_seconds
+BLACKLIST_BUCKET_SHARDS = settings.security.revocation.blacklist_bucket_shards
+
+
+def pack_token_id(token_id: str) -> str:
+    """UUID jti хранится как base64 от 16 байт: 22 символа вместо 36."""
+    try:
+        raw = uuid.UUID(token_id).bytes
+    except ValueError:
+        return token_id
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def blacklist_bucket(expires_at: int) -> int:
+    return int(expires_at) // BLACKLIST_BUCKET_SECONDS
+
+
+def blacklist_key(field: str, expires_at: int) -> str:
+    """field — упакованный jti (pack_token_id)."""
+    # Записи сгруппированы в хэши по времени истечения токена. Хэш удаляется
+    # целиком, когда истекают все токены корзины, так что отдельный TTL
+    # на каждый jti не нужен. Корзина ещё делится по хэшу jti, чтобы каждый
+    # хэш оставался listpack, см. RevocationConfig.blacklist_bucket_shards
+    shard = zlib.crc32(field.encode()) % BLACKLIST_BUCKET_SHARDS
+    return f"{BLACKLIST_PREFIX}{blacklist_bucket(expires_at)}:{shard}"
+
+
+def blacklist_key_bucket(key: str) -> int:
+    bucket, _, _ = key.removeprefix(BLACKLIST_PREFIX).partition(":")
+    return int(bucket)
+
+
+# Скользящее окно на sorted set'ах, все ключи проверяются атомарно.
+# KEYS — ключи окон; ARGV[1] — уникальный id попытки,
+# далее для каждого ключа пара: длина окна (мс), лимит.
+# Возвращает {номер превышенного окна или 0, через сколько мс повторить}.
+SLIDING_WINDOW_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+for i, key in ipairs(KEYS) do
+    local window = tonumber(ARGV[i * 2])
+    local limit = tonumber(ARGV[i * 2 + 1])
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    if redis.call('ZCARD', key) >= limit then
+        local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+        return {i, tonumber(oldest[2]) + window - now}
+    end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, now, ARGV[1])
+    redis.call('PEXPIRE', key, tonumber(ARGV[i * 2]))
+end
+return {0, 0}
+"""
+
+# Запись хэша, только если нет ключа-запрета.
+# KEYS[1] — хэш, KEYS[2] — запрет; ARGV[1] — TTL хэша (с),
+# далее пары поле, значение. Возвращает 1, если хэш записан.
+HSET_UNLESS_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return 0
+end
+redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[1]))
+return 1
+"""
+
+
+@dataclass(slots=True)
+class RedisPoolStats:
+    max_connections: int
+    in_use: int
+    available: int
+
 
 class RedisHelper:
     def __init__(
@@ -13,33 +96,213 @@ class RedisHelper:
         port: int = settings.redis.port,
         db: int = settings.redis.db,
         max_connections: int = settings.redis.max_connections,
+        pool_timeout: float = settings.redis.pool_timeout,
     ):
         self.client: Redis | None = None
-        self.pool = redis.ConnectionPool(
+        self._pubsub_client: Redis | None = None
+        self._sliding_window_script: AsyncScript | None = None
+        self._hset_unless_script: AsyncScript | None = None
+        # Когда все соединения заняты, запрос ждёт до pool_timeout, а не
+        # падает сразу с ConnectionError, как у обычного ConnectionPool
+        self.pool = redis.BlockingConnectionPool(
             host=host,
             port=port,
             db=db,
             max_connections=max_connections,
+            timeout=pool_timeout,  # type: ignore
+            decode_responses=True,
+        )
+        # Подписка держит соединение постоянно, поэтому у неё свой пул
+        self.pubsub_pool = redis.ConnectionPool(
+            host=host,
+            port=port,
+            db=db,
             decode_responses=True,
         )
 
-    async def __aenter__(self) -> Self:
+    async def connect(self) -> None:
         if not self.client:
-            self.client = redis.Redis.from_pool(self.pool)
-        return self
+            self.client = redis.Redis(connection_pool=self.pool)
+            self._pubsub_client = redis.Redis(connection_pool=self.pubsub_pool)
+            self._sliding_window_script = self.client.register_script(
+                SLIDING_WINDOW_SCRIPT
+            )
+            self._hset_unless_script = self.client.register_script(HSET_UNLESS_SCRIPT)
 
-    async def __aexit__(self, exc_type, exc, tb):
+    async def close(self) -> None:
         if self.client:
-            await self.client.close()
+            await self.client.aclose()
             self.client = None
+            self._sliding_window_script = None
+            self._hset_unless_script = None
+        if self._pubsub_client:
+            await self._pubsub_client.aclose()
+            self._pubsub_client = None
+        await self.pool.disconnect()
+        await self.pubsub_pool.disconnect()
+
+    async def __aenter__(self) -> Self:
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def stats(self) -> RedisPoolStats:
+        return RedisPoolStats(
+            max_connections=self.pool.max_connections,
+            in_use=len(self.pool._in_use_connections),
+            available=len(self.pool._available_connections),
+        )
+
+    def pubsub(self) -> PubSub:
+        """Подписка на отдельном соединении, вне пула запросов."""
+        return self._pubsub_client.pubsub()  # type: ignore
+
+    def pipeline(self, transaction: bool = False) -> Pipeline:
+        """Пачка команд за один round trip: async with redis.pipeline() as pipe."""
+        return self.client.pipeline(transaction=transaction)  # type: ignore
 
     async def add_token_to_blacklist(
         self,
         token_id: str,
-        ex: int = settings.security.jwt.access_token_expire_minutes,
+        expires_at: int,
+        channel: str = settings.security.revocation.channel,
     ):
-        await self.client.set(token_id, "blacklisted", ex=ex * 60)  # type: ignore
+        """expires_at — claim exp токена: запись живёт, пока токен валиден."""
+        if expires_at <= time.time():
+            return
+        field = pack_token_id(token_id)
+        key = blacklist_key(field, expires_at)
+        bucket_end = (blacklist_bucket(expires_at) + 1) * BLACKLIST_BUCKET_SECONDS
+        # Запись и оповещение воркеров уходят одним round trip
+        async with self.pipeline() as pipe:
+            pipe.hset(key, field, 1)
+            pipe.expireat(key, bucket_end)
+            pipe.publish(channel, f"{token_id} {int(expires_at)}")
+            await pipe.execute()
+
+    async def is_blacklisted_token(self, token_id: str, expires_at: int) -> bool:
+        field = pack_token_id(token_id)
+        return await self.client.hexists(  # type: ignore
+            blacklist_key(field, expires_at), field
+        )
+
+    async def scan_blacklist(self) -> AsyncIterator[tuple[int, list[str]]]:
+        """Отдаёт (корзина, упакованные jti) по каждому хэшу чёрного списка.
+
+        Хэши небольшие (см. blacklist_key), поэтому поля читаются HKEYS
+        пачкой по тысяче ключей за round trip, без HSCAN по каждому.
+        """
+        keys = []
+        async for key in self.client.scan_iter(  # type: ignore
+            match=BLACKLIST_PREFIX + "*", count=1000
+        ):
+            keys.append(key)
+            if len(keys) >= 1000:
+                async for entry in self._read_blacklist_keys(keys):
+                    yield entry
+                keys = []
+        async for entry in self._read_blacklist_keys(keys):
+            yield entry
+
+    async def _read_blacklist_keys(
+        self, keys: list[str]
+    ) -> AsyncIterator[tuple[int, list[str]]]:
+        if not keys:
+            return
+        async with self.pipeline() as pipe:
+            for key in keys:
+                pipe.hkeys(key)
+            results = await pipe.execute()
+        for key, fields in zip(keys, results):
+            if fields:
+                yield blacklist_key_bucket(key), fields
+
+    async def set_user_revoked_before(
+        self,
+        user_id: str,
+        timestamp: int,
+        ex: int,
+        channel: str = settings.security.revocation.users_channel,
+    ) -> None:
+        async with self.pipeline() as pipe:
+            pipe.set(REVOKED_BEFORE_PREFIX + user_id, timestamp, ex=ex)
+            pipe.publish(channel, f"{user_id} {timestamp}")
+            await pipe.execute()
+
+    async def get_user_revoked_before(self, user_id: str) -> int | None:
+        result = await self.client.get(REVOKED_BEFORE_PREFIX + user_id)  # type: ignore
+        return int(result) if result is not None else None
+
+    async def get_revocation_state(
+        self, tokens: list[tuple[str, int]], user_ids: list[str]
+    ) -> tuple[list[bool], list[int | None]]:
+        """Чёрный список и отметки отзыва пользователей за один round trip.
+
+        tokens — список (jti, exp).
+        """
+        async with self.pipeline() as pipe:
+            for token_id, expires_at in tokens:
+                field = pack_token_id(token_id)
+                pipe.hexists(blacklist_key(field, expires_at), field)
+            if user_ids:
+                pipe.mget([REVOKED_BEFORE_PREFIX + user_id for user_id in user_ids])
+            results = await pipe.execute()
+        blacklisted = [bool(value) for value in results[: len(tokens)]]
+        revoked_before = (
+            [int(value) if value is not None else None for value in results[-1]]
+            if user_ids
+            else []
+        )
+        return blacklisted, revoked_before
+
+    async def scan_user_revocations(self) -> AsyncIterator[tuple[str, int]]:
+        keys = [
+            key
+            async for key in self.client.scan_iter(  # type: ignore
+                match=REVOKED_BEFORE_PREFIX + "*", count=1000
+            )
+        ]
+        for start in range(0, len(keys), 1000):
+            chunk = keys[start : start + 1000]
+            values = await self.client.mget(chunk)  # type: ignore
+            for key, value in zip(chunk, values):
+                if value is not None:
+                    yield key.removeprefix(REVOKED_BEFORE_PREFIX), int(value)
+
+    async def hit_sliding_windows(
+        self, windows: list[tuple[str, int, int]]
+    ) -> tuple[int, int]:
+        """windows — список (ключ, длина окна в мс, лимит).
+
+        Возвращает номер первого превышенного окна (с 1) или 0
+        и время до освобождения места в окне в мс.
+        """
+        script = self._sliding_window_script
+        args: list[str | int] = [uuid.uuid4().hex]
+        for _, window_ms, limit in windows:
+            args.extend((window_ms, limit))
+        exceeded, retry_after_ms = await script(  # type: ignore
+            keys=[key for key, _, _ in windows], args=args
+        )
+        return int(exceeded), int(retry_after_ms)
+
+    async def hset_unless(
+        self, key: str, guard: str, mapping: dict[str, str], ex: int
+    ) -> bool:
+        """Атомарно записывает хэш с TTL, если ключа guard нет."""
+        args: list[str | int] = [ex]
+        for field, value in mapping.items():
+            args.extend((field, value))
+        written = await self._hset_unless_script(  # type: ignore
+            keys=[key, guard], args=args
+        )
+        return bool(written)
+
+
+redis_helper = RedisHelper()
+
 
-    async def is_blacklisted_token(self, token_id: str) -> bool:
-        result = await self.client.get(token_id)  # type: ignore
-        return bool(result)
+async def get_redis() -> RedisHelper:
+    return redis_helper
@@ -0,0 +1,328 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from .bloom import BloomFilter
+from .config import settings
+from .redis_client import (
+    BLACKLIST_BUCKET_SECONDS,
+    BLACKLIST_BUCKET_SHARDS,
+    RedisHelper,
+    blacklist_bucket,
+    pack_token_id,
+    redis_helper,
+)
+from .security import PAYLOAD_KEY_IAT_MS, PAYLOAD_KEY_USER_ID
+
+logger = logging.getLogger(__name__)
+
+PRUNE_INTERVAL_SECONDS = 60
+RECONNECT_DELAY_SECONDS = 1
+# Ёмкость первого слоя фильтра корзины, если размер заранее неизвестен
+MIN_BUCKET_CAPACITY = 1024
+# Отметки, записанные до перехода на миллисекунды, хранятся в секундах:
+# всё меньше этого значения — секунды (в мс это 1973 год)
+SECONDS_WATERMARK_LIMIT = 10**11
+
+
+def watermark_ms(revoked_before: int) -> int:
+    if revoked_before < SECONDS_WATERMARK_LIMIT:
+        return revoked_before * 1000
+    return revoked_before
+
+
+def issued_at_ms(payload: dict) -> int:
+    # Токены, выпущенные до появления iat_ms, несут только iat в секундах
+    iat_ms = payload.get(PAYLOAD_KEY_IAT_MS)
+    if iat_ms is not None:
+        return int(iat_ms)
+    return int(payload.get("iat", 0)) * 1000
+
+
+@dataclass(slots=True)
+class RevocationFilterStats:
+    size: int = 0
+    filter_bytes: int = 0
+    users: int = 0
+    local_negatives: int = 0
+    redis_checks: int = 0
+    confirmed_revoked: int = 0
+    resyncs: int = 0
+
+
+class RevocationFilter:
+    """Локальная копия чёрного списка jti и отметок отзыва пользователей.
+
+    При старте воркер подписывается на каналы отзыва и загружает текущее
+    состояние из Redis. Пока подписка жива, отрицательный ответ даётся
+    локально, а в Redis уходят только возможные совпадения. Если подписка
+    оборвалась, все проверки идут в Redis до повторной синхронизации.
+
+    jti хранятся не строками, а в фильтрах Блума по корзинам времени
+    истечения, как в Redis: несколько байт на запись вместо сотни, и
+    истёкшая корзина выбрасывается целиком. Ложное срабатывание фильтра
+    лишь отправляет проверку в Redis.
+
+    Отметка пользователя — unix-время в миллисекундах, раньше которого
+    выпущенные токены (iat_ms < отметки) считаются отозванными. Секунд
+    мало: токен, выпущенный в ту же секунду до выхода со всех устройств,
+    остался бы действительным, а нестрогое сравнение отвергло бы и токен
+    повторного входа в ту же секунду. Хранится по одному ключу на
+    пользователя, сколько бы токенов у него ни было.
+    """
+
+    def __init__(
+        self,
+        redis: RedisHelper,
+        channel: str,
+        users_channel: str,
+        user_entry_ttl: int,
+        enabled: bool = True,
+        error_rate: float = 0.01,
+    ) -> None:
+        self.redis = redis
+        self.channel = channel
+        self.users_channel = users_channel
+        self.user_entry_ttl = user_entry_ttl
+        self.enabled = enabled
+        self.error_rate = error_rate
+        self.ready = False
+        self.stats = RevocationFilterStats()
+        # Корзина времени истечения (blacklist_bucket) -> упакованные jti
+        self._revoked: dict[int, BloomFilter] = {}
+        self._revoked_before: dict[str, int] = {}
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        self.ready = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def add(self, token_id: str, expires_at: float) -> None:
+        self._bucket_filter(blacklist_bucket(int(expires_at))).add(
+            pack_token_id(token_id)
+        )
+        self._update_size()
+
+    def _bucket_filter(
+        self, bucket: int, capacity: int = MIN_BUCKET_CAPACITY
+    ) -> BloomFilter:
+        bucket_filter = self._revoked.get(bucket)
+        if bucket_filter is None:
+            bucket_filter = BloomFilter(
+                capacity=max(capacity, MIN_BUCKET_CAPACITY),
+                error_rate=self.error_rate,
+            )
+            self._revoked[bucket] = bucket_filter
+        return bucket_filter
+
+    def _update_size(self) -> None:
+        self.stats.size = sum(len(f) for f in self._revoked.values())
+        self.stats.filter_bytes = sum(f.nbytes for f in self._revoked.values())
+
+    def add_user(self, user_id: str, revoked_before: int) -> None:
+        current = self._revoked_before.get(user_id, 0)
+        self._revoked_before[user_id] = max(current, watermark_ms(revoked_before))
+        self.stats.users = len(self._revoked_before)
+
+    def might_be_revoked(self, token_id: str, expires_at: float) -> bool:
+        if not self.ready:
+            return True
+        bucket_filter = self._revoked.get(blacklist_bucket(int(expires_at)))
+        return bucket_filter is not None and pack_token_id(token_id) in bucket_filter
+
+    async def revoke(self, token_id: str, expires_at: int) -> None:
+        await self.redis.add_token_to_blacklist(
+            token_id=token_id, expires_at=expires_at, channel=self.channel
+        )
+        self.add(token_id, expires_at)
+
+    async def revoke_user(self, user_id: str) -> None:
+        """Отзывает все выпущенные на текущий момент токены пользователя."""
+        revoked_before = int(time.time() * 1000)
+        await self.redis.set_user_revoked_before(
+            user_id=user_id,
+            timestamp=revoked_before,
+            ex=self.user_entry_ttl,
+            channel=self.users_channel,
+        )
+        self.add_user(user_id, revoked_before)
+
+    @staticmethod
+    def _issued_before(payload: dict, revoked_before: int | None) -> bool:
+        if revoked_before is None:
+            return False
+        return issued_at_ms(payload) < watermark_ms(revoked_before)
+
+    async def is_token_revoked(self, payload: dict) -> bool:
+        jti = payload.get("jti")
+        user_id = payload.get(PAYLOAD_KEY_USER_ID)
+        if jti is None or "exp" not in payload:
+            return True
+        if self.ready:
+            if user_id is not None and self._issued_before(
+                payload, self._revoked_before.get(user_id)
+            ):
+                return True
+            if not self.might_be_revoked(jti, payload["exp"]):
+                self.stats.local_negatives += 1
+                return False
+        self.stats.redis_checks += 1
+        blacklisted, revoked_before = await self.redis.get_revocation_state(
+            tokens=[(jti, payload["exp"])],
+            user_ids=[user_id] if user_id is not None and not self.ready else [],
+        )
+        revoked = blacklisted[0] or (
+            bool(revoked_before) and self._issued_before(payload, revoked_before[0])
+        )
+        if revoked:
+            self.stats.confirmed_revoked += 1
+        return revoked
+
+    async def get_revoked(self, payloads: list[dict]) -> list[bool]:
+        results = [
+            payload.get("jti") is None or "exp" not in payload for payload in payloads
+        ]
+        candidates = []
+        for index, payload in enumerate(payloads):
+            if results[index]:
+                continue
+            if self.ready:
+                user_id = payload.get(PAYLOAD_KEY_USER_ID)
+                if user_id is not None and self._issued_before(
+                    payload, self._revoked_before.get(user_id)
+                ):
+                    results[index] = True
+                    continue
+                if not self.might_be_revoked(payload["jti"], payload["exp"]):
+                    self.stats.local_negatives += 1
+                    continue
+            candidates.append(index)
+        if not candidates:
+            return results
+
+        self.stats.redis_checks += len(candidates)
+        user_candidates = (
+            []
+            if self.ready
+            else [
+                index
+                for index in candidates
+                if payloads[index].get(PAYLOAD_KEY_USER_ID) is not None
+            ]
+        )
+        blacklisted, revoked_before = await self.redis.get_revocation_state(
+            tokens=[
+                (payloads[index]["jti"], payloads[index]["exp"]) for index in candidates
+            ],
+            user_ids=[
+                payloads[index][PAYLOAD_KEY_USER_ID] for index in user_candidates
+            ],
+        )
+        for index, revoked in zip(candidates, blacklisted):
+            results[index] = revoked
+        for index, watermark in zip(user_candidates, revoked_before):
+            if self._issued_before(payloads[index], watermark):
+                results[index] = True
+        self.stats.confirmed_revoked += sum(results[index] for index in candidates)
+        return results
+
+    def _prune(self) -> None:
+        now = time.time()
+        # Корзина истекла, когда истёк последний токен в ней
+        self._revoked = {
+            bucket: bucket_filter
+            for bucket, bucket_filter in self._revoked.items()
+            if (bucket + 1) * BLACKLIST_BUCKET_SECONDS > now
+        }
+        # Токены, выпущенные раньше отметки, к этому времени уже истекли
+        self._revoked_before = {
+            user_id: revoked_before
+            for user_id, revoked_before in self._revoked_before.items()
+            if revoked_before / 1000 + self.user_entry_ttl > now
+        }
+        self._update_size()
+        self.stats.users = len(self._revoked_before)
+
+    async def _sync(self) -> None:
+        async for bucket, fields in self.redis.scan_blacklist():
+            # Корзина поделена на хэши поровну: размер первого из них
+            # задаёт ёмкость фильтра с запасом, чтобы хватило одного слоя
+            bucket_filter = self._bucket_filter(
+                bucket, capacity=len(fields) * BLACKLIST_BUCKET_SHARDS * 5 // 4
+            )
+            for field in fields:
+                bucket_filter.add(field)
+        async for user_id, revoked_before in self.redis.scan_user_revocations():
+            self.add_user(user_id, revoked_before)
+        self._prune()
+        self.stats.resyncs += 1
+
+    def _handle_message(self, message: dict) -> None:
+        if message["channel"] == self.users_channel:
+            user_id, revoked_before = message["data"].split()
+            self.add_user(user_id, int(revoked_before))
+        else:
+            token_id, expires_at = message["data"].split()
+            self.add(token_id, int(expires_at))
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                # Сначала подписка, потом загрузка, чтобы не потерять
+                # отзывы, пришедшие во время загрузки
+                await pubsub.subscribe(self.channel, self.users_channel)
+                await self._sync()
+                # Готовность — только после разбора накопленного за загрузку.
+                # Подтверждения подписки тоже возвращают None при
+                # ignore_subscribe_messages, поэтому здесь они не скрываются
+                while True:
+                    message = await pubsub.get_message(timeout=0)
+                    if message is None:
+                        break
+                    if message["type"] == "message":
+                        self._handle_message(message)
+                self.ready = True
+                logger.info(
+                    f"Revocation filter synced: {self.stats.size} revoked tokens, "
+                    f"{self.stats.users} revoked users"
+                )
+                last_prune = time.monotonic()
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1.0
+                    )
+                    if message is not None and message["type"] == "message":
+                        self._handle_message(message)
+                    if time.monotonic() - last_prune > PRUNE_INTERVAL_SECONDS:
+                        self._prune()
+                        last_prune = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Revocation filter lost sync with Redis: {e}")
+            finally:
+                self.ready = False
+                await pubsub.aclose()
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+revocation_filter = RevocationFilter(
+    redis=redis_helper,
+    channel=settings.security.revocation.channel,
+    users_channel=settings.security.revocation.users_channel,
+    user_entry_ttl=settings.security.jwt.refresh_token_expire_days * 24 * 60 * 60,
+    enabled=settings.security.revocation.local_filter_enabled,
+    error_rate=settings.security.revocation.local_filter_error_rate,
+)
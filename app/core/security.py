@@ -1,22 +1,54 @@
+import hashlib
+import logging
 import uuid
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 
 import bcrypt
 import jwt
 from db.models.user import User
 from itsdangerous import URLSafeTimedSerializer
 
+from .cache import TTLCache
 from .config import settings
+from .hashing import PasswordHashingPool, bcrypt_rounds, calibrate_bcrypt_rounds
+from .keys import KeyRing
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache
+def private_key_pem() -> bytes:
+    # Читается один раз: им подписываются и JWT, и токены подтверждения
+    return settings.security.private_key.read_bytes()
+
+
+@lru_cache
+def get_serializer() -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(secret_key=private_key_pem())
 
-serializer = URLSafeTimedSerializer(
-    secret_key=settings.security.private_key.read_text()
-)
 
 """Функции хэширования и валидации пароля"""
 
 
+DEFAULT_BCRYPT_ROUNDS = 12
+
+
+class PasswordPolicy:
+    def __init__(self, rounds: int) -> None:
+        self.rounds = rounds
+
+    def needs_rehash(self, hashed_password: bytes) -> bool:
+        return bcrypt_rounds(hashed_password) < self.rounds
+
+
+password_policy = PasswordPolicy(
+    rounds=settings.security.password.bcrypt_rounds or DEFAULT_BCRYPT_ROUNDS
+)
+
+
 def hash_password(password: str) -> bytes:
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=password_policy.rounds)
     return bcrypt.hashpw(
         password=password.encode(),
         salt=salt,
@@ -30,53 +62,151 @@ def validate_password(password: str, hashed_password: bytes) -> bool:
     )
 
 
+password_hashing_pool = PasswordHashingPool(
+    max_workers=settings.security.password.hash_workers,
+    max_queue_size=settings.security.password.hash_queue_size,
+)
+
+
+async def hash_password_async(password: str) -> bytes:
+    return await password_hashing_pool.run(hash_password, password)
+
+
+async def validate_password_async(password: str, hashed_password: bytes) -> bool:
+    return await password_hashing_pool.run(validate_password, password, hashed_password)
+
+
+async def calibrate_password_hashing() -> None:
+    config = settings.security.password
+    if config.bcrypt_rounds is not None:
+        logger.info(f"Using configured bcrypt cost: {config.bcrypt_rounds}")
+        return
+    password_policy.rounds = await password_hashing_pool.run(
+        calibrate_bcrypt_rounds,
+        config.target_hash_ms,
+        config.min_bcrypt_rounds,
+        config.max_bcrypt_rounds,
+    )
+    logger.info(
+        f"Calibrated bcrypt cost: {password_policy.rounds} "
+        f"(target {config.target_hash_ms} ms)"
+    )
+
+
 """Функции для работы с JWT"""
 
 PAYLOAD_KEY_TOKEN_TYPE = "type"
 PAYLOAD_KEY_USER_ID = "user_id"
 PAYLOAD_KEY_SUB = "sub"
 PAYLOAD_KEY_USER_ROLE = "role"
+# iat в JWT целые секунды; для сравнения с отметкой отзыва нужна точность выше
+PAYLOAD_KEY_IAT_MS = "iat_ms"
 ACCESS_TOKEN = "access"
 REFRESH_TOKEN = "refresh"
 
 
+key_ring = KeyRing(
+    algorithm=settings.security.jwt.algorithm,
+    accepted_algorithms=settings.security.jwt.accepted_algorithms,
+)
+
+
+def load_keys() -> None:
+    """Разбирает ключи JWT в key_ring; повторный вызов ничего не делает.
+
+    Вызывается из create_app: в serve.py это происходит в мастере до fork,
+    и воркеры получают готовые объекты ключей.
+    """
+    if key_ring.kids:
+        return
+    key_ring.load_signing_pem(private_key_pem())
+    key_ring.load_verification_key(settings.security.public_key)
+    for path in settings.security.extra_public_keys:
+        key_ring.load_verification_key(path)
+
+
+def reload_keys() -> str:
+    """Перечитывает ключи с диска и переключает подпись на закрытый ключ
+    из settings.security.private_key; возвращает его kid.
+
+    Ключи проверки добавляются раньше ключа подписи, прежние остаются в
+    кольце. При нескольких экземплярах новый открытый ключ сначала
+    раскладывается всем через extra_public_keys, иначе токены одного
+    экземпляра не пройдут проверку на другом. Секрет токенов
+    подтверждения (get_serializer) до перезапуска не меняется.
+    """
+    for path in (settings.security.public_key, *settings.security.extra_public_keys):
+        key_ring.load_verification_key(path)
+    return key_ring.load_signing_key(settings.security.private_key)
+
+
 def encode_jwt(
     data: dict,
-    private_key: str = settings.security.private_key.read_text(),
-    algorithm: str = settings.security.jwt.algorithm,
-    expire_minutes: int = settings.security.jwt.access_token_expire_minutes,
+    expire_minutes: int | None = None,
     expires_delta: timedelta | None = None,
+    keys: KeyRing = key_ring,
 ) -> str:
     to_encode = data.copy()
     now = datetime.now(timezone.utc)
     if expires_delta:
         expire = now + expires_delta
     else:
+        if expire_minutes is None:
+            expire_minutes = settings.security.jwt.access_token_expire_minutes
         expire = now + timedelta(minutes=expire_minutes)
     jti = str(uuid.uuid4())
-    to_encode.update(exp=expire, iat=now, jti=jti)
+    to_encode.update(
+        exp=expire,
+        iat=now,
+        jti=jti,
+        **{PAYLOAD_KEY_IAT_MS: int(now.timestamp() * 1000)},
+    )
+    signing_key = keys.signing_key
     encoded_jwt = jwt.encode(
         payload=to_encode,
-        key=private_key,
-        algorithm=algorithm,
+        key=signing_key.private_key,
+        algorithm=signing_key.algorithm,
+        headers={"kid": signing_key.kid},
     )
     return encoded_jwt
 
 
 def decode_jwt(
     token: str,
-    public_key: str = settings.security.public_key.read_text(),
-    algorithm: str = settings.security.jwt.algorithm,
+    keys: KeyRing = key_ring,
 ):
-
+    header = jwt.get_unverified_header(token)
+    verification_key = keys.verification_key(header.get("kid"))
     decoded_jwt = jwt.decode(
         jwt=token,
-        key=public_key,
-        algorithms=[algorithm],
+        key=verification_key.public_key,
+        algorithms=[verification_key.algorithm],
     )
     return decoded_jwt
 
 
+verified_token_cache: TTLCache[bytes, dict] = TTLCache(
+    max_size=settings.security.token_cache.max_size,
+    ttl=settings.security.token_cache.ttl_seconds,
+)
+
+
+def decode_jwt_cached(token: str) -> dict:
+    # Кэшируется только результат проверки подписи, отзыв токена
+    # проверяется вызывающим кодом на каждом запросе
+    key = hashlib.sha256(token.encode()).digest()
+    payload = verified_token_cache.get(key)
+    if payload is None:
+        payload = decode_jwt(token)
+        verified_token_cache.set(key, payload, expires_at=payload.get("exp"))
+    return dict(payload)
+
+
+def remove_verification_key(kid: str) -> None:
+    key_ring.remove_verification_key(kid)
+    verified_token_cache.clear()
+
+
 def create_access_token(user: User):
     payload = {
         PAYLOAD_KEY_TOKEN_TYPE: ACCESS_TOKEN,
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from email.message import EmailMessage
+from typing import AsyncIterator
+
+from aiosmtplib import SMTP
+from aiosmtplib.errors import (
+    SMTPException,
+    SMTPRecipientsRefused,
+    SMTPResponseException,
+)
+
+from .config import SMTPConfig, settings
+
+logger = logging.getLogger(__name__)
+
+# Сервер ответил отказом: соединение исправно, повтор ничего не даст
+REJECTED_ERRORS = (SMTPResponseException, SMTPRecipientsRefused)
+
+
+@dataclass(slots=True)
+class SMTPPoolStats:
+    connects: int = 0
+    reuses: int = 0
+    sent: int = 0
+    health_check_failures: int = 0
+    retries: int = 0
+    discarded: int = 0
+
+
+@dataclass(slots=True)
+class PooledConnection:
+    smtp: SMTP
+    last_used: float
+    messages_sent: int = 0
+
+
+class SMTPPool:
+    """Пул постоянных SMTP-соединений.
+
+    Соединение открывается, проходит TLS и логин один раз и дальше
+    переиспользуется. Перед выдачей соединения, простоявшего дольше
+    pool_health_check_seconds, отправляется NOOP; простоявшие дольше
+    pool_idle_timeout_seconds закрываются, не дожидаясь, пока их оборвёт
+    сервер. Одновременных сессий не больше pool_size.
+
+    Если переиспользованное соединение оказалось закрытым сервером,
+    письмо один раз переотправляется через новое соединение.
+    """
+
+    def __init__(self, config: SMTPConfig) -> None:
+        self.config = config
+        self.stats = SMTPPoolStats()
+        self._idle: deque[PooledConnection] = deque()
+        self._semaphore = asyncio.Semaphore(config.pool_size)
+        self._in_use = 0
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    async def _connect(self) -> PooledConnection:
+        smtp = SMTP(
+            hostname=self.config.host,
+            port=self.config.port,
+            use_tls=self.config.use_tls,
+            start_tls=self.config.start_tls,
+            timeout=self.config.timeout_seconds,
+        )
+        await smtp.connect()
+        try:
+            if self.config.auth:
+                await smtp.login(
+                    self.config.username, self.config.password.get_secret_value()
+                )
+        except BaseException:
+            smtp.close()
+            raise
+        self.stats.connects += 1
+        return PooledConnection(smtp=smtp, last_used=time.monotonic())
+
+    async def _discard(self, connection: PooledConnection) -> None:
+        self.stats.discarded += 1
+        if not connection.smtp.is_connected:
+            return
+        try:
+            await connection.smtp.quit()
+        except (SMTPException, OSError):
+            connection.smtp.close()
+
+    async def _is_healthy(self, connection: PooledConnection) -> bool:
+        idle_for = time.monotonic() - connection.last_used
+        if not connection.smtp.is_connected:
+            return False
+        if idle_for > self.config.pool_idle_timeout_seconds:
+            return False
+        if idle_for > self.config.pool_health_check_seconds:
+            try:
+                await connection.smtp.noop()
+            except (SMTPException, OSError) as e:
+                self.stats.health_check_failures += 1
+                logger.info(f"Pooled SMTP connection failed health check: {e}")
+                return False
+        return True
+
+    async def _acquire(self, fresh: bool) -> tuple[PooledConnection, bool]:
+        while self._idle and not fresh:
+            # Самое свежее соединение — с наименьшим шансом оказаться закрытым
+            connection = self._idle.pop()
+            if await self._is_healthy(connection):
+                self.stats.reuses += 1
+                return connection, True
+            await self._discard(connection)
+        return await self._connect(), False
+
+    async def _release(self, connection: PooledConnection) -> None:
+        connection.last_used = time.monotonic()
+        connection.messages_sent += 1
+        if (
+            connection.smtp.is_connected
+            and connection.messages_sent < self.config.max_messages_per_connection
+        ):
+            self._idle.append(connection)
+        else:
+            await self._discard(connection)
+
+    @asynccontextmanager
+    async def _session(
+        self, fresh: bool = False
+    ) -> AsyncIterator[tuple[PooledConnection, bool]]:
+        async with self._semaphore:
+            connection, reused = await self._acquire(fresh)
+            self._in_use += 1
+            try:
+                yield connection, reused
+            except REJECTED_ERRORS:
+                # Сервер отказал в письме, но соединение живо: сбросим
+                # транзакцию и вернём его в пул
+                try:
+                    await connection.smtp.rset()
+                except (SMTPException, OSError):
+                    await self._discard(connection)
+                else:
+                    await self._release(connection)
+                raise
+            except BaseException:
+                await self._discard(connection)
+                raise
+            else:
+                await self._release(connection)
+            finally:
+                self._in_use -= 1
+
+    async def send_message(self, message: EmailMessage) -> None:
+        reused = False
+        try:
+            async with self._session() as (connection, reused):
+                await connection.smtp.send_message(message)
+        except REJECTED_ERRORS:
+            raise
+        except (SMTPException, OSError) as e:
+            if not reused:
+                raise
+            # Сервер мог закрыть соединение между NOOP и отправкой
+            self.stats.retries += 1
+            logger.info(f"Pooled SMTP connection broke, retrying on a new one: {e}")
+            async with self._session(fresh=True) as (connection, _):
+                await connection.smtp.send_message(message)
+        self.stats.sent += 1
+
+    async def close(self) -> None:
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+
+smtp_pool = SMTPPool(settings.smtp)
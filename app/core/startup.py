@@ -0,0 +1,25 @@
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class StartupStats:
+    # Отсчёт ведётся от импорта этого модуля: serve.py импортирует его
+    # первым, до приложения. Воркер после fork отсчитывает готовность от
+    # fork (reset), а import_seconds наследует от мастера
+    started_at: float = field(default_factory=time.perf_counter)
+    import_seconds: float = 0.0
+    ready_seconds: float = 0.0
+
+    def reset(self) -> None:
+        self.started_at = time.perf_counter()
+        self.ready_seconds = 0.0
+
+    def mark_imported(self) -> None:
+        self.import_seconds = time.perf_counter() - self.started_at
+
+    def mark_ready(self) -> None:
+        self.ready_seconds = time.perf_counter() - self.started_at
+
+
+startup_stats = StartupStats()
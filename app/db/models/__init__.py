@@ -1,9 +1,10 @@
 from .base import Base
-from .outbox import Outbox
+from .outbox import Outbox, OutboxArchive
 from .user import User
 
 __all__ = (
     "User",
     "Base",
     "Outbox",
+    "OutboxArchive",
 )
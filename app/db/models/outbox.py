@@ -2,7 +2,8 @@ import uuid
 from enum import Enum
 from typing import Any
 
-from sqlalchemy.dialects.postgresql import JSON, UUID
+from sqlalchemy import Index, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -16,9 +17,26 @@ class Status(str, Enum):
 
 class Outbox(Base):
     __tablename__ = "outbox"
+    __table_args__ = (
+        # Релей выбирает только pending по created_at; отправленные строки
+        # в индекс не попадают, и он не растёт вместе с таблицей
+        Index(
+            "ix_outbox_pending_created_at",
+            "created_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
-    payload: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
     status: Mapped[Status] = mapped_column(default=Status.pending)
+
+
+class OutboxArchive(Base):
+    __tablename__ = "outbox_archive"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB, nullable=False)
+    status: Mapped[Status]
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from core.config import OutboxConfig, settings
+from sqlalchemy import delete, insert, select
+
+from .models import Outbox, OutboxArchive
+from .models.outbox import Status
+from .session import DatabaseHelper, db_helper
+
+logger = logging.getLogger(__name__)
+
+# Пауза между пачками, чтобы очистка не занимала соединение непрерывно
+BATCH_PAUSE_SECONDS = 0.1
+
+ARCHIVE_COLUMNS = ("id", "payload", "status", "created_at", "updated_at")
+
+
+@dataclass(slots=True)
+class OutboxRetentionStats:
+    runs: int = 0
+    deleted: int = 0
+    archived: int = 0
+    errors: int = 0
+
+
+class OutboxRetention:
+    """Удаляет или переносит в outbox_archive старые отправленные записи.
+
+    Каждая пачка — отдельная короткая транзакция на batch_size строк,
+    выбранных через SKIP LOCKED, так что несколько экземпляров могут
+    работать одновременно и не держат долгих блокировок.
+    """
+
+    def __init__(self, db: DatabaseHelper, config: OutboxConfig) -> None:
+        self.db = db
+        self.config = config
+        self.stats = OutboxRetentionStats()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self.config.retention_enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def purge_batch(self, cutoff: datetime) -> int:
+        # Без ORDER BY: порядок удаления не важен, а LIMIT позволяет
+        # остановить сканирование, не сортируя всю таблицу
+        expired = (
+            select(Outbox.id)
+            .where(Outbox.status == Status.sent, Outbox.created_at < cutoff)
+            .limit(self.config.retention_batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        removed = delete(Outbox).where(Outbox.id.in_(expired))
+        async with self.db.session_factory() as session, session.begin():
+            if self.config.archive:
+                moved = removed.returning(
+                    *(Outbox.__table__.c[name] for name in ARCHIVE_COLUMNS)
+                ).cte("moved")
+                result = await session.execute(
+                    insert(OutboxArchive).from_select(ARCHIVE_COLUMNS, select(*moved.c))
+                )
+            else:
+                result = await session.execute(
+                    removed.execution_options(synchronize_session=False)
+                )
+        return result.rowcount  # type: ignore
+
+    async def purge(self) -> int:
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            seconds=self.config.retention_seconds
+        )
+        total = 0
+        while True:
+            count = await self.purge_batch(cutoff)
+            total += count
+            if count < self.config.retention_batch_size:
+                break
+            await asyncio.sleep(BATCH_PAUSE_SECONDS)
+        self.stats.runs += 1
+        if self.config.archive:
+            self.stats.archived += total
+        else:
+            self.stats.deleted += total
+        if total:
+            action = "archived" if self.config.archive else "deleted"
+            logger.info(f"Outbox retention {action} {total} sent messages")
+        return total
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.purge()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.errors += 1
+                logger.warning(f"Outbox retention failed: {e}")
+            await asyncio.sleep(self.config.retention_interval_seconds)
+
+
+outbox_retention = OutboxRetention(db=db_helper, config=settings.outbox)
@@ -0,0 +1,97 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from core.metrics import Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# ASGI scope текущего HTTP-запроса; вне запросов — None
+current_scope: ContextVar[dict | None] = ContextVar("current_scope", default=None)
+
+CHECKOUT_STARTED_KEY = "checked_out_at"
+
+
+def current_route() -> str:
+    scope = current_scope.get()
+    if scope is None:
+        return "background"
+    route = scope.get("route")
+    # Сырой путь не используется как метка, чтобы не плодить серии
+    return getattr(route, "path", "unmatched")
+
+
+@dataclass(slots=True)
+class PoolStats:
+    checkouts: int = 0
+    # Выдачи, при которых пул уже работал сверх pool_size
+    overflow_checkouts: int = 0
+    timeouts: int = 0
+    wait: Histogram = field(default_factory=Histogram)
+    hold: dict[str, Histogram] = field(default_factory=dict)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Пул, который замеряет ожидание соединения и время его удержания.
+
+    Ожидание — время внутри _do_get, включая открытие нового соединения
+    и ожидание свободного при исчерпанном max_overflow. Удержание
+    считается от checkout до checkin и группируется по маршруту.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+        event.listen(self, "checkout", self._on_checkout)
+        event.listen(self, "checkin", self._on_checkin)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.wait.observe(time.perf_counter() - started)
+        self.stats.checkouts += 1
+        if self.overflow() > 0:
+            self.stats.overflow_checkouts += 1
+        return record
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        connection_record.info[CHECKOUT_STARTED_KEY] = (
+            time.perf_counter(),
+            current_route(),
+        )
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop(CHECKOUT_STARTED_KEY, None)
+        if started is None:
+            return
+        checked_out_at, route = started
+        histogram = self.stats.hold.get(route)
+        if histogram is None:
+            histogram = self.stats.hold[route] = Histogram()
+        histogram.observe(time.perf_counter() - checked_out_at)
+
+
+class RouteContextMiddleware:
+    """ASGI-middleware: делает scope запроса доступным пулу.
+
+    Роутер записывает маршрут в scope уже после middleware, поэтому в
+    контекст кладётся сам scope, а шаблон пути читается при checkout.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
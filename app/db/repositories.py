@@ -1,30 +1,73 @@
+import uuid
 from typing import Any
 
-from core.security import hash_password
+from core.revocation import revocation_filter
 from db.models.outbox import Outbox
-from sqlalchemy import select, update
+from sqlalchemy import bindparam, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .models import User
+from .models.user import UserRole
+from .user_cache import UserIdentity, user_cache
 
+# Горячие запросы строятся один раз при импорте. Ключ кэша компиляции у
+# неизменного выражения мемоизирован, поэтому на вызов не тратится ни
+# построение, ни компиляция, а одинаковый SQL позволяет asyncpg
+# переиспользовать prepared statement соединения.
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+USER_BY_ID = select(User).where(User.id == bindparam("user_id"))
+CONFIRM_USER = (
+    update(User)
+    .where(User.email == bindparam("email"))
+    .values(is_verified=True)
+    .returning(User.id)
+    .execution_options(synchronize_session=False)
+)
 
-async def create_user(session: AsyncSession, email: str, password: str) -> User:
+
+async def create_user(
+    session: AsyncSession, email: str, hashed_password: bytes
+) -> User:
+    """Создаёт пользователя и письмо подтверждения в outbox одним коммитом."""
     user = User(
+        id=uuid.uuid4(),
         email=email,
-        password=hash_password(password),
+        password=hashed_password,
     )
     session.add(user)
+    add_confirmation_email_to_outbox(
+        session=session,
+        to_email=email,
+        message_id=str(user.id),
+    )
     await session.commit()
     return user
 
 
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
-    stmt = select(User).where(User.email == email)
-    user = await session.execute(stmt)
+    user = await session.execute(USER_BY_EMAIL, {"email": email})
+    return user.scalar_one_or_none()
+
+
+async def get_user_by_id(session: AsyncSession, user_id: uuid.UUID) -> User | None:
+    user = await session.execute(USER_BY_ID, {"user_id": user_id})
     return user.scalar_one_or_none()
 
 
-async def save_confirmation_email_to_outbox(
+async def get_user_identity(
+    session: AsyncSession, user_id: uuid.UUID
+) -> UserIdentity | None:
+    """Читает пользователя из БД и кладёт в кэш; кэш до сессии проверяет
+    вызывающий, чтобы при попадании соединение вовсе не бралось."""
+    user = await get_user_by_id(session=session, user_id=user_id)
+    if user is None:
+        return None
+    identity = UserIdentity.from_user(user)
+    await user_cache.set(identity)
+    return identity
+
+
+def add_confirmation_email_to_outbox(
     session: AsyncSession,
     to_email: str,
     message_id: str,
@@ -35,16 +78,53 @@ async def save_confirmation_email_to_outbox(
     }
     message = Outbox(payload=payload)
     session.add(message)
-    await session.commit()
 
 
 async def confirm_user(session: AsyncSession, email: str) -> None:
+    result = await session.execute(CONFIRM_USER, {"email": email})
+    user_id = result.scalar_one_or_none()
+    await session.commit()
+    if user_id is not None:
+        await user_cache.invalidate(user_id)
+
+
+async def set_user_active(
+    session: AsyncSession, email: str, is_active: bool
+) -> uuid.UUID | None:
+    """Возвращает id пользователя или None, если такого email нет."""
     stmt = (
         update(User)
         .where(User.email == email)
-        .values(
-            is_verified=True,
-        )
+        .values(is_active=is_active)
+        .returning(User.id)
     )
+    user_id = (await session.execute(stmt)).scalar_one_or_none()
+    await session.commit()
+    if user_id is None:
+        return None
+    await user_cache.invalidate(user_id)
+    if not is_active:
+        # Токены с устаревшими claims не должны проходить stateless-проверку
+        await revocation_filter.revoke_user(str(user_id))
+    return user_id
+
+
+async def set_user_role(
+    session: AsyncSession, email: str, role: UserRole
+) -> uuid.UUID | None:
+    """Возвращает id пользователя или None, если такого email нет."""
+    stmt = update(User).where(User.email == email).values(role=role).returning(User.id)
+    user_id = (await session.execute(stmt)).scalar_one_or_none()
+    await session.commit()
+    if user_id is not None:
+        await user_cache.invalidate(user_id)
+        await revocation_filter.revoke_user(str(user_id))
+    return user_id
+
+
+async def update_user_password(
+    session: AsyncSession, user_id: uuid.UUID, hashed_password: bytes
+) -> None:
+    stmt = update(User).where(User.id == user_id).values(password=hashed_password)
     await session.execute(stmt)
     await session.commit()
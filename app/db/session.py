@@ -1,8 +1,33 @@
-from typing import AsyncGenerator
+import itertools
+import logging
+import time
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncGenerator, Literal
 
 from core.config import settings
-from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
-                                    create_async_engine)
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession,
+                                    async_sessionmaker, create_async_engine)
+
+from .pool import InstrumentedAsyncQueuePool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class Replica:
+    engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    # До этого момента (time.monotonic) реплика считается недоступной
+    retry_at: float = 0.0
+
+
+@dataclass(slots=True)
+class ReadRoutingStats:
+    replica_sessions: int = 0
+    primary_fallbacks: int = 0
+    replica_errors: int = 0
 
 
 class DatabaseHelper:
@@ -12,17 +37,55 @@ class DatabaseHelper:
         pool_size: int,
         max_overflow: int,
         echo: bool = False,
+        pool_timeout: float = 30.0,
+        prepared_statement_cache_size: int = 100,
+        replica_urls: list[str] | None = None,
+        replica_strategy: Literal["round_robin", "least_connections"] = "round_robin",
+        replica_retry_seconds: float = 5.0,
     ) -> None:
+        # Кэш prepared statements asyncpg на каждое соединение пула
+        connect_args = {"prepared_statement_cache_size": prepared_statement_cache_size}
 
         self.engine = create_async_engine(
             url=url,
             echo=echo,
+            poolclass=InstrumentedAsyncQueuePool,
             pool_size=pool_size,
             max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            connect_args=connect_args,
         )
+        self.session_factory = self._make_session_factory(self.engine)
+
+        self.replicas = [
+            Replica(
+                engine=engine,
+                session_factory=self._make_session_factory(engine),
+            )
+            for engine in (
+                create_async_engine(
+                    url=replica_url,
+                    echo=echo,
+                    poolclass=InstrumentedAsyncQueuePool,
+                    pool_size=pool_size,
+                    max_overflow=max_overflow,
+                    pool_timeout=pool_timeout,
+                    connect_args=connect_args,
+                )
+                for replica_url in replica_urls or []
+            )
+        ]
+        self.replica_strategy = replica_strategy
+        self.replica_retry_seconds = replica_retry_seconds
+        self.stats = ReadRoutingStats()
+        self._round_robin = itertools.count()
 
-        self.session_factory = async_sessionmaker(
-            bind=self.engine,
+    @staticmethod
+    def _make_session_factory(
+        engine: AsyncEngine,
+    ) -> async_sessionmaker[AsyncSession]:
+        return async_sessionmaker(
+            bind=engine,
             expire_on_commit=False,
             autoflush=False,
             autocommit=False,
@@ -32,10 +95,66 @@ class DatabaseHelper:
         async with self.session_factory() as session:
             yield session
 
+    def _replica_order(self) -> list[Replica]:
+        now = time.monotonic()
+        available = [
+            replica for replica in self.replicas if replica.retry_at <= now
+        ]
+        if not available:
+            return []
+        if self.replica_strategy == "least_connections":
+            return sorted(
+                available,
+                key=lambda replica: replica.engine.pool.checkedout(),  # type: ignore
+            )
+        start = next(self._round_robin) % len(available)
+        return available[start:] + available[:start]
+
+    async def get_read_session(self) -> AsyncGenerator[AsyncSession, None]:
+        """Сессия для чтения: реплика по стратегии или primary как запасной.
+
+        Реплика может отставать от primary, поэтому сюда идут только
+        запросы, которым это не страшно. Записи — через get_session.
+        """
+        for replica in self._replica_order():
+            session = replica.session_factory()
+            try:
+                # Соединение берётся сразу, чтобы недоступная реплика
+                # обнаружилась здесь, а не посреди обработчика
+                await session.connection()
+            except (SQLAlchemyError, OSError) as e:
+                await session.close()
+                replica.retry_at = time.monotonic() + self.replica_retry_seconds
+                self.stats.replica_errors += 1
+                logger.warning(
+                    f"Replica {replica.engine.url.host}:{replica.engine.url.port} "
+                    f"unavailable: {e}"
+                )
+                continue
+            self.stats.replica_sessions += 1
+            async with session:
+                yield session
+            return
+
+        if self.replicas:
+            self.stats.primary_fallbacks += 1
+        async with self.session_factory() as session:
+            yield session
+
+    def read_session(self) -> AbstractAsyncContextManager[AsyncSession]:
+        """get_read_session вне Depends: реплика берётся только при входе
+        в async with, а не на каждый запрос заранее."""
+        return asynccontextmanager(self.get_read_session)()
+
 
 db_helper = DatabaseHelper(
     url=str(settings.db.url),
     pool_size=settings.db.pool_size,
     max_overflow=settings.db.max_overflow,
     echo=settings.db.echo,
+    pool_timeout=settings.db.pool_timeout,
+    prepared_statement_cache_size=settings.db.prepared_statement_cache_size,
+    replica_urls=[str(url) for url in settings.db.replica_urls],
+    replica_strategy=settings.db.replica_strategy,
+    replica_retry_seconds=settings.db.replica_retry_seconds,
 )
@@ -0,0 +1,133 @@
+import logging
+import uuid
+from dataclasses import dataclass
+from typing import Self
+
+from core.cache import TTLCache
+from core.config import settings
+from core.redis_client import RedisHelper, redis_helper
+
+from .models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+USER_CACHE_PREFIX = "user:"
+# Отметка недавней инвалидации, см. UserCache.set
+USER_CACHE_STALE_PREFIX = "user_stale:"
+
+
+@dataclass(frozen=True, slots=True)
+class UserIdentity:
+    """Поля пользователя, нужные для аутентификации, без хэша пароля."""
+
+    id: uuid.UUID
+    email: str
+    role: UserRole
+    is_active: bool
+    is_verified: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> Self:
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            is_active=user.is_active,
+            is_verified=user.is_verified,
+        )
+
+    def to_redis(self) -> dict[str, str]:
+        return {
+            "email": self.email,
+            "role": self.role.value,
+            "is_active": str(int(self.is_active)),
+            "is_verified": str(int(self.is_verified)),
+        }
+
+    @classmethod
+    def from_redis(cls, user_id: uuid.UUID, data: dict[str, str]) -> Self:
+        return cls(
+            id=user_id,
+            email=data["email"],
+            role=UserRole(data["role"]),
+            is_active=data["is_active"] == "1",
+            is_verified=data["is_verified"] == "1",
+        )
+
+
+class UserCache:
+    """Двухуровневый кэш: LRU в процессе и хэш в Redis.
+
+    Записи в БД, меняющие эти поля, удаляют ключ в Redis сразу. Локальные
+    копии других воркеров живут не дольше local_ttl, поэтому он короткий.
+    Ошибки Redis не мешают аутентификации: запрос уходит в БД.
+
+    Промах кэша читается с реплики, которая может ещё не увидеть только
+    что закоммиченное изменение. Поэтому инвалидация на replica_lag
+    секунд запрещает запись этого пользователя в кэш, и старая строка не
+    возвращается туда до истечения redis_ttl.
+    """
+
+    def __init__(
+        self,
+        redis: RedisHelper,
+        local_max_size: int,
+        local_ttl: int,
+        redis_ttl: int,
+        replica_lag: int,
+    ) -> None:
+        self.redis = redis
+        self.redis_ttl = redis_ttl
+        self.replica_lag = replica_lag
+        self.local: TTLCache[uuid.UUID, UserIdentity] = TTLCache(
+            max_size=local_max_size, ttl=local_ttl
+        )
+
+    async def get(self, user_id: uuid.UUID) -> UserIdentity | None:
+        identity = self.local.get(user_id)
+        if identity is not None:
+            return identity
+        try:
+            data = await self.redis.client.hgetall(f"{USER_CACHE_PREFIX}{user_id}")  # type: ignore
+        except Exception as e:
+            logger.warning(f"User cache read failed for {user_id}: {e}")
+            return None
+        if not data:
+            return None
+        identity = UserIdentity.from_redis(user_id, data)
+        self.local.set(user_id, identity)
+        return identity
+
+    async def set(self, identity: UserIdentity) -> None:
+        try:
+            written = await self.redis.hset_unless(
+                key=f"{USER_CACHE_PREFIX}{identity.id}",
+                guard=f"{USER_CACHE_STALE_PREFIX}{identity.id}",
+                mapping=identity.to_redis(),
+                ex=self.redis_ttl,
+            )
+        except Exception as e:
+            logger.warning(f"User cache write failed for {identity.id}: {e}")
+            return
+        # Локальная копия — только если строка не попала под запрет
+        if written:
+            self.local.set(identity.id, identity)
+
+    async def invalidate(self, user_id: uuid.UUID) -> None:
+        self.local.pop(user_id)
+        try:
+            async with self.redis.pipeline() as pipe:
+                pipe.delete(f"{USER_CACHE_PREFIX}{user_id}")
+                pipe.set(f"{USER_CACHE_STALE_PREFIX}{user_id}", 1, ex=self.replica_lag)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"User cache invalidation failed for {user_id}: {e}")
+
+
+user_cache = UserCache(
+    redis=redis_helper,
+    local_max_size=settings.user_cache.local_max_size,
+    local_ttl=settings.user_cache.local_ttl_seconds,
+    redis_ttl=settings.user_cache.redis_ttl_seconds,
+    replica_lag=settings.user_cache.replica_lag_seconds,
+)
@@ -1,31 +1,107 @@
+import asyncio
 import logging
+import signal
+from contextlib import asynccontextmanager
 
 import uvicorn
 from api import router
-from fastapi import FastAPI
+from api.metrics import router as metrics_router
+from core.redis_client import redis_helper
+from core.revocation import revocation_filter
+from core.config import get_settings
+from core.security import (
+    calibrate_password_hashing,
+    load_keys,
+    password_hashing_pool,
+    reload_keys,
+)
+from core.smtp_pool import smtp_pool
+from core.startup import startup_stats
+from db.pool import RouteContextMiddleware
+from fastapi import APIRouter, FastAPI
 from messaging import router as nats_router
+from messaging.replay import dead_letter_replayer
 from fastapi.middleware.cors import CORSMiddleware
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-app = FastAPI(title="AUTH_PRACTICE")
+def reload_signing_key() -> None:
+    # Битый или не тот PEM не должен ронять процесс: остаются прежние ключи
+    try:
+        kid = reload_keys()
+    except Exception as e:
+        logger.error(f"Key reload failed, keeping current keys: {e}")
+        return
+    logger.info(f"Keys reloaded, signing with kid={kid}")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-app.include_router(router)
-app.include_router(nats_router)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await redis_helper.connect()
+    await revocation_filter.start()
+    await calibrate_password_hashing()
+    # Ротация ключа подписи без перезапуска: kill -HUP <pid мастера>
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, reload_signing_key)
+        reload_on_sighup = True
+    except (NotImplementedError, RuntimeError, AttributeError) as e:
+        # Не главный поток (TestClient) или нет SIGHUP / add_signal_handler
+        logger.warning(f"SIGHUP key reload is unavailable: {e!r}")
+        reload_on_sighup = False
+    yield
+    if reload_on_sighup:
+        loop.remove_signal_handler(signal.SIGHUP)
+    await dead_letter_replayer.stop()
+    await revocation_filter.stop()
+    await redis_helper.close()
+    await smtp_pool.close()
+    password_hashing_pool.shutdown()
+
+
+@asynccontextmanager
+async def ready(app: FastAPI):
+    # Lifespan роутеров выполняется после lifespan приложения в порядке
+    # подключения, поэтому этот роутер подключается последним
+    startup_stats.mark_ready()
+    logger.info(
+        f"Ready in {startup_stats.ready_seconds:.3f}s "
+        f"(imports {startup_stats.import_seconds:.3f}s)"
+    )
+    yield
+
+
+def create_app() -> FastAPI:
+    # serve.py вызывает фабрику до fork, чтобы воркеры унаследовали
+    # настройки и разобранные ключи готовыми
+    startup_stats.mark_imported()
+    get_settings()
+    load_keys()
+    app = FastAPI(title="AUTH_PRACTICE", lifespan=lifespan)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(RouteContextMiddleware)
+
+    app.include_router(router)
+    app.include_router(nats_router)
+    app.include_router(metrics_router)
+    app.include_router(APIRouter(lifespan=ready))
+    return app
+
 
 if __name__ == "__main__":
+    # Запуск для разработки; в контейнере используется serve.py
     uvicorn.run(
-        "main:app",
+        "main:create_app",
+        factory=True,
         host="0.0.0.0",
         port=8000,
         reload=True,
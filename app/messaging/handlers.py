@@ -0,0 +1,101 @@
+import logging
+import time
+from dataclasses import dataclass, field
+
+from aiosmtplib.errors import SMTPException
+from core.config import settings
+from core.mail import send_confirmation_email
+from core.metrics import Histogram
+from core.security import get_serializer
+from faststream.nats import NatsBroker
+from faststream.nats.message import NatsMessage
+from utils.helpers import handle_failed_message
+
+from .retry import backoff_delay, delivery_attempt, is_permanent
+
+DEAD_LETTER_SUBJECT = "dead.email.send"
+DEAD_LETTER_STREAM = "dead-letters-stream"
+
+
+@dataclass(slots=True)
+class ConsumerStats:
+    received: int = 0
+    acked: int = 0
+    retried: int = 0
+    dead_lettered: int = 0
+    permanent_failures: int = 0
+    smtp_errors: int = 0
+    unexpected_errors: int = 0
+    handle_seconds: Histogram = field(default_factory=Histogram)
+
+
+consumer_stats = ConsumerStats()
+
+
+async def dead_letter(
+    msg: str,
+    raw_msg: NatsMessage,
+    broker: NatsBroker,
+    error: Exception,
+    attempts: int,
+) -> None:
+    headers = {}
+    msg_id = raw_msg.headers.get("Nats-Msg-Id")
+    if msg_id is not None:
+        headers["Nats-Msg-Id"] = msg_id
+    await broker.publish(
+        message=handle_failed_message(msg, str(error), attempts=attempts),
+        subject=DEAD_LETTER_SUBJECT,
+        stream=DEAD_LETTER_STREAM,
+        headers=headers,
+    )
+    await raw_msg.ack()
+    consumer_stats.dead_lettered += 1
+
+
+async def handle_email(
+    msg: str,
+    raw_msg: NatsMessage,
+    broker: NatsBroker,
+    logger: logging.Logger,
+) -> None:
+    """Отправляет письмо подтверждения; общая часть подписчика в API и воркера.
+
+    Номер попытки берётся из метаданных доставки JetStream, поэтому
+    счётчик не нужно хранить снаружи. Постоянные отказы (5xx на само
+    письмо) уходят в DLQ сразу, временные повторяются с экспоненциальной
+    задержкой до retry.max_attempts.
+    """
+    retry = settings.email_worker.retry
+    consumer_stats.received += 1
+    started = time.perf_counter()
+    attempt = delivery_attempt(raw_msg)
+
+    try:
+        await send_confirmation_email(msg, get_serializer().dumps(msg))
+        await raw_msg.ack()
+        consumer_stats.acked += 1
+
+    except Exception as e:
+        if isinstance(e, SMTPException):
+            consumer_stats.smtp_errors += 1
+        else:
+            consumer_stats.unexpected_errors += 1
+
+        if is_permanent(e):
+            consumer_stats.permanent_failures += 1
+            logger.error(f"Permanent SMTP failure, dead-lettering: {e}")
+            await dead_letter(msg, raw_msg, broker, e, attempt)
+        elif attempt >= retry.max_attempts:
+            logger.error(f"Giving up after {attempt} attempts: {e}")
+            await dead_letter(msg, raw_msg, broker, e, attempt)
+        else:
+            delay = backoff_delay(attempt, retry)
+            logger.warning(
+                f"Delivery attempt {attempt} failed, retrying in {delay:.1f}s: {e}"
+            )
+            await raw_msg.nack(delay=delay)
+            consumer_stats.retried += 1
+
+    finally:
+        consumer_stats.handle_seconds.observe(time.perf_counter() - started)
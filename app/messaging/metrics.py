@@ -0,0 +1,51 @@
+from core.metrics import MetricsWriter
+from core.smtp_pool import smtp_pool
+from messaging.handlers import consumer_stats
+
+
+def write_consumer_metrics(metrics: MetricsWriter) -> None:
+    for result, value in (
+        ("acked", consumer_stats.acked),
+        ("retried", consumer_stats.retried),
+        ("dead_lettered", consumer_stats.dead_lettered),
+    ):
+        metrics.counter(
+            "email_messages", "Email messages by outcome", value, {"result": result}
+        )
+    metrics.counter(
+        "email_messages_received", "Email messages delivered", consumer_stats.received
+    )
+    for kind, value in (
+        ("smtp", consumer_stats.smtp_errors),
+        ("unexpected", consumer_stats.unexpected_errors),
+    ):
+        metrics.counter(
+            "email_handler_errors", "Email handler errors", value, {"kind": kind}
+        )
+    metrics.counter(
+        "email_permanent_failures",
+        "Emails dead-lettered without retry after a permanent SMTP rejection",
+        consumer_stats.permanent_failures,
+    )
+    metrics.histogram(
+        "email_handle_seconds",
+        "Time to handle one email message",
+        consumer_stats.handle_seconds,
+    )
+
+    smtp = smtp_pool.stats
+    metrics.gauge("smtp_pool_idle", "Idle pooled SMTP connections", smtp_pool.idle)
+    metrics.gauge("smtp_pool_in_use", "SMTP sessions in progress", smtp_pool.in_use)
+    metrics.counter(
+        "smtp_connects", "New SMTP connections (TLS + login)", smtp.connects
+    )
+    metrics.counter("smtp_reuses", "Sends on a reused SMTP connection", smtp.reuses)
+    metrics.counter("smtp_sent", "Messages accepted by the SMTP server", smtp.sent)
+    metrics.counter(
+        "smtp_health_check_failures",
+        "Pooled connections that failed NOOP",
+        smtp.health_check_failures,
+    )
+    metrics.counter(
+        "smtp_retries", "Sends retried after a broken pooled connection", smtp.retries
+    )
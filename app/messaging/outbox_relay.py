@@ -0,0 +1,207 @@
+import asyncio
+import dataclasses
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import nats
+from core.config import OutboxConfig, settings
+from db.models import Outbox
+from db.models.outbox import Status
+from db.session import DatabaseHelper, db_helper
+from nats.js import JetStreamContext
+from nats.js.errors import BadRequestError
+from sqlalchemy import select, update
+
+from .streams import email_stream
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 1
+
+
+@dataclass(slots=True)
+class OutboxRelayStats:
+    batches: int = 0
+    published: int = 0
+    publish_errors: int = 0
+    malformed: int = 0
+    notifications: int = 0
+    # Возраст самой старой записи последней пачки в момент отправки
+    lag_seconds: float = 0.0
+
+
+class OutboxRelay:
+    """Переносит записи outbox в JetStream.
+
+    Пачка захватывается SELECT ... FOR UPDATE SKIP LOCKED, поэтому
+    несколько экземпляров релея разбирают таблицу параллельно, не ожидая
+    друг друга. Id записи уходит в Nats-Msg-Id: если релей упал между
+    публикацией и коммитом, повторная отправка отбрасывается дедупликацией
+    стрима в пределах duplicate_window. Полный стрим отклоняет публикацию
+    (discard=new), и такие записи тоже остаются pending.
+
+    Между пачками релей ждёт NOTIFY от триггера на вставку в outbox, а раз
+    в poll_interval_seconds проверяет таблицу сам — на случай, если
+    уведомление потерялось вместе с соединением.
+    """
+
+    def __init__(self, db: DatabaseHelper, nats_url: str, config: OutboxConfig) -> None:
+        self.db = db
+        self.nats_url = nats_url
+        self.config = config
+        self.stats = OutboxRelayStats()
+        self._wakeup = asyncio.Event()
+        self._js: JetStreamContext | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self.stats.notifications += 1
+        self._wakeup.set()
+
+    async def _ensure_stream(self) -> None:
+        # Стрим объявляет и подписчик, но релей может стартовать раньше него
+        config = dataclasses.replace(
+            email_stream.config, subjects=email_stream.subjects
+        )
+        try:
+            try:
+                await self._js.add_stream(config)  # type: ignore
+            except BadRequestError:
+                # Стрим создан с прежними настройками (например, discard=old)
+                await self._js.update_stream(config)  # type: ignore
+        except Exception as e:
+            logger.warning(f"Could not declare stream {email_stream.name}: {e}")
+
+    async def _publish(self, outbox_id: uuid.UUID, to_email: str) -> None:
+        await self._js.publish(  # type: ignore
+            subject=self.config.subject,
+            payload=to_email.encode(),
+            timeout=self.config.publish_timeout_seconds,
+            headers={"Nats-Msg-Id": str(outbox_id), "content-type": "text/plain"},
+        )
+
+    async def relay_batch(self) -> tuple[int, int]:
+        """Отправляет одну пачку, возвращает (захвачено, отправлено)."""
+        async with self.db.session_factory() as session, session.begin():
+            stmt = (
+                select(Outbox)
+                .where(Outbox.status == Status.pending)
+                .order_by(Outbox.created_at)
+                .limit(self.config.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = (await session.scalars(stmt)).all()
+            if not rows:
+                self.stats.lag_seconds = 0.0
+                return 0, 0
+
+            malformed_ids = [row.id for row in rows if "to_email" not in row.payload]
+            publishable = [row for row in rows if "to_email" in row.payload]
+            results = await asyncio.gather(
+                *(
+                    self._publish(row.id, row.payload["to_email"])
+                    for row in publishable
+                ),
+                return_exceptions=True,
+            )
+            sent_ids = []
+            for row, result in zip(publishable, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"Outbox {row.id} publish failed: {result}")
+                else:
+                    sent_ids.append(row.id)
+
+            # Неотправленные записи остаются pending и попадут в следующую пачку
+            for ids, status in (
+                (sent_ids, Status.sent),
+                (malformed_ids, Status.failed),
+            ):
+                if ids:
+                    await session.execute(
+                        update(Outbox)
+                        .where(Outbox.id.in_(ids))
+                        .values(status=status)
+                        .execution_options(synchronize_session=False)
+                    )
+
+        oldest = min(row.created_at for row in rows)
+        self.stats.lag_seconds = (datetime.now(timezone.utc) - oldest).total_seconds()
+        self.stats.batches += 1
+        self.stats.published += len(sent_ids)
+        self.stats.publish_errors += len(publishable) - len(sent_ids)
+        self.stats.malformed += len(malformed_ids)
+        logger.info(
+            f"Relayed {len(sent_ids)}/{len(rows)} outbox messages, "
+            f"lag {self.stats.lag_seconds:.3f}s"
+        )
+        return len(rows), len(sent_ids)
+
+    async def _wait(self) -> None:
+        try:
+            await asyncio.wait_for(
+                self._wakeup.wait(), timeout=self.config.poll_interval_seconds
+            )
+        except TimeoutError:
+            pass
+
+    async def _relay(self) -> None:
+        while True:
+            # Сброс до запроса: NOTIFY, пришедший во время пачки, не теряется
+            self._wakeup.clear()
+            claimed, sent = await self.relay_batch()
+            # Полная пачка без ошибок — в таблице, скорее всего, есть ещё
+            if claimed < self.config.batch_size or sent < claimed:
+                await self._wait()
+
+    async def _run(self) -> None:
+        while True:
+            nc = None
+            try:
+                nc = await nats.connect(self.nats_url)
+                self._js = nc.jetstream()
+                await self._ensure_stream()
+                async with self.db.engine.connect() as connection:
+                    raw = await connection.get_raw_connection()
+                    listener = raw.driver_connection
+                    await listener.add_listener(  # type: ignore
+                        self.config.notify_channel, self._on_notify
+                    )
+                    logger.info(
+                        f"Outbox relay listening on {self.config.notify_channel}"
+                    )
+                    try:
+                        await self._relay()
+                    finally:
+                        await listener.remove_listener(  # type: ignore
+                            self.config.notify_channel, self._on_notify
+                        )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Outbox relay error, reconnecting: {e}")
+            finally:
+                if nc is not None:
+                    await nc.close()
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+
+outbox_relay = OutboxRelay(
+    db=db_helper,
+    nats_url=str(settings.nats.url),
+    config=settings.outbox,
+)
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Callable
+
+import nats
+from core.config import DeadLetterReplayConfig, settings
+from nats.aio.msg import Msg
+from nats.errors import TimeoutError as NatsTimeoutError
+from nats.js import JetStreamContext
+from nats.js.api import AckPolicy, ConsumerConfig, DeliverPolicy
+from utils.exceptions import ReplayInProgressError
+
+from .handlers import DEAD_LETTER_SUBJECT
+from .streams import dead_letters_stream, email_stream
+
+logger = logging.getLogger(__name__)
+
+# Эфемерный консьюмер удаляется сервером, если процесс упал посреди прохода
+CONSUMER_INACTIVE_THRESHOLD_SECONDS = 60.0
+
+
+def rfc3339(moment: datetime) -> str:
+    # nats-py 2.10 передаёт opt_start_time в JSON как есть, datetime там
+    # не сериализуется; строку принимают и новые версии
+    return moment.astimezone(UTC).isoformat().replace("+00:00", "Z")
+
+
+@dataclass(slots=True)
+class ReplayFilter:
+    # Подстрока текста ошибки, без учёта регистра
+    error: str | None = None
+    # Границы времени попадания сообщения в dead-letter стрим
+    since: datetime | None = None
+    until: datetime | None = None
+
+    def matches(self, payload: dict) -> bool:
+        if self.error is None:
+            return True
+        return self.error.lower() in str(payload.get("error", "")).lower()
+
+
+@dataclass(slots=True)
+class ReplayProgress:
+    dry_run: bool = False
+    # Сообщений в dead-letter стриме на момент старта
+    total: int = 0
+    scanned: int = 0
+    matched: int = 0
+    replayed: int = 0
+    deleted: int = 0
+    malformed: int = 0
+    publish_errors: int = 0
+    # Сколько раз ждали, пока email-stream разгрузится
+    backpressure_waits: int = 0
+    last_sequence: int = 0
+    finished: bool = False
+    error: str | None = None
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: float | None = None
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.replayed / elapsed if elapsed > 0 else 0.0
+
+
+class RateLimiter:
+    """Равномерный темп: acquire(n) ждёт, пока не накопится место под n штук."""
+
+    def __init__(self, rate_per_second: float) -> None:
+        self._interval = 1 / rate_per_second
+        self._next = 0.0
+
+    async def acquire(self, n: int = 1) -> None:
+        now = time.monotonic()
+        if self._next > now:
+            await asyncio.sleep(self._next - now)
+            now = self._next
+        self._next = max(now, self._next) + n * self._interval
+
+
+class DeadLetterReplayer:
+    """Повторно отправляет original_message из dead-letter стрима в email.send.
+
+    Стрим читается эфемерным pull-консьюмером без подтверждений, начиная с
+    since, до последнего сообщения на момент старта: то, что попадёт в DLQ
+    во время прохода, не перечитывается. Подходящие сообщения публикуются
+    пачками с темпом rate_per_second и Nats-Msg-Id вида replay-<seq>, так
+    что повторный запуск в пределах duplicate_window не задвоит письма.
+    Отправленные сообщения удаляются из DLQ (delete_replayed).
+
+    email-stream ограничен max_msgs, поэтому перед каждой пачкой
+    проверяется, есть ли в нём место: иначе переполнение вытеснило бы
+    ещё не доставленные письма.
+    """
+
+    def __init__(self, nats_url: str, config: DeadLetterReplayConfig) -> None:
+        self.nats_url = nats_url
+        self.config = config
+        self.progress: ReplayProgress | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, replay_filter: ReplayFilter, dry_run: bool = False) -> None:
+        """Запускает проход в фоне; ход виден через progress."""
+        if self.running:
+            raise ReplayInProgressError
+        self.progress = ReplayProgress(dry_run=dry_run)
+        self._task = asyncio.create_task(
+            self._run(replay_filter, dry_run, self.progress)
+        )
+
+    async def _run(
+        self, replay_filter: ReplayFilter, dry_run: bool, progress: ReplayProgress
+    ) -> None:
+        try:
+            await self.replay(replay_filter, dry_run=dry_run, progress=progress)
+        except Exception:
+            # Уже записано в progress.error
+            pass
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def replay(
+        self,
+        replay_filter: ReplayFilter,
+        dry_run: bool = False,
+        progress: ReplayProgress | None = None,
+        on_progress: Callable[[ReplayProgress], None] | None = None,
+    ) -> ReplayProgress:
+        progress = progress or ReplayProgress(dry_run=dry_run)
+        nc = await nats.connect(self.nats_url)
+        try:
+            await self._replay(
+                nc.jetstream(), replay_filter, dry_run, progress, on_progress
+            )
+        except Exception as e:
+            progress.error = str(e)
+            logger.error(f"Dead-letter replay failed: {e}")
+            raise
+        finally:
+            progress.finished = True
+            progress.finished_at = time.monotonic()
+            await nc.close()
+        logger.info(
+            f"Dead-letter replay finished: {progress.replayed}/{progress.matched} "
+            f"replayed, {progress.scanned} scanned in {progress.elapsed_seconds:.1f}s"
+        )
+        return progress
+
+    async def _replay(
+        self,
+        js: JetStreamContext,
+        replay_filter: ReplayFilter,
+        dry_run: bool,
+        progress: ReplayProgress,
+        on_progress: Callable[[ReplayProgress], None] | None,
+    ) -> None:
+        info = await js.stream_info(dead_letters_stream.name)
+        progress.total = info.state.messages
+        last_seq = info.state.last_seq
+        if not info.state.messages:
+            return
+
+        sub = await js.pull_subscribe(
+            DEAD_LETTER_SUBJECT,
+            stream=dead_letters_stream.name,
+            config=ConsumerConfig(
+                deliver_policy=(
+                    DeliverPolicy.BY_START_TIME
+                    if replay_filter.since
+                    else DeliverPolicy.ALL
+                ),
+                opt_start_time=(  # type: ignore
+                    rfc3339(replay_filter.since) if replay_filter.since else None
+                ),
+                ack_policy=AckPolicy.NONE,
+                inactive_threshold=CONSUMER_INACTIVE_THRESHOLD_SECONDS,
+            ),
+        )
+        limiter = RateLimiter(self.config.rate_per_second)
+        try:
+            done = False
+            while not done:
+                try:
+                    msgs = await sub.fetch(
+                        self.config.batch_size,
+                        timeout=self.config.fetch_timeout_seconds,
+                    )
+                except NatsTimeoutError:
+                    break
+
+                batch: list[tuple[int, str]] = []
+                for msg in msgs:
+                    seq = msg.metadata.sequence.stream
+                    if seq > last_seq or (
+                        replay_filter.until
+                        and msg.metadata.timestamp > replay_filter.until
+                    ):
+                        done = True
+                        break
+                    progress.scanned += 1
+                    progress.last_sequence = seq
+                    if seq == last_seq:
+                        done = True
+
+                    original = self._original_message(msg, replay_filter, progress)
+                    if original is not None:
+                        progress.matched += 1
+                        batch.append((seq, original))
+
+                if batch and not dry_run:
+                    await self._replay_batch(js, batch, limiter, progress)
+                if on_progress is not None:
+                    on_progress(progress)
+        finally:
+            await sub.unsubscribe()
+
+    @staticmethod
+    def _original_message(
+        msg: Msg, replay_filter: ReplayFilter, progress: ReplayProgress
+    ) -> str | None:
+        try:
+            payload = json.loads(msg.data)
+            original = payload["original_message"]
+        except (ValueError, TypeError, KeyError):
+            progress.malformed += 1
+            logger.warning(
+                f"Malformed dead-letter message {msg.metadata.sequence.stream}"
+            )
+            return None
+        if not isinstance(original, str) or not replay_filter.matches(payload):
+            return None
+        return original
+
+    async def _free_slots(self, js: JetStreamContext, progress: ReplayProgress) -> int:
+        while True:
+            info = await js.stream_info(email_stream.name)
+            if info.config.max_msgs is None or info.config.max_msgs < 0:
+                return self.config.batch_size
+            free = info.config.max_msgs - info.state.messages
+            if free > 0:
+                return free
+            progress.backpressure_waits += 1
+            await asyncio.sleep(self.config.backpressure_poll_seconds)
+
+    async def _replay_batch(
+        self,
+        js: JetStreamContext,
+        batch: list[tuple[int, str]],
+        limiter: RateLimiter,
+        progress: ReplayProgress,
+    ) -> None:
+        while batch:
+            free = await self._free_slots(js, progress)
+            chunk, batch = batch[:free], batch[free:]
+            await limiter.acquire(len(chunk))
+            results = await asyncio.gather(
+                *(self._publish(js, seq, original) for seq, original in chunk),
+                return_exceptions=True,
+            )
+            for (seq, _), result in zip(chunk, results):
+                if isinstance(result, Exception):
+                    progress.publish_errors += 1
+                    logger.warning(f"Replay of dead letter {seq} failed: {result}")
+                    continue
+                progress.replayed += 1
+                if not self.config.delete_replayed:
+                    continue
+                try:
+                    await js.delete_msg(dead_letters_stream.name, seq)
+                    progress.deleted += 1
+                except Exception as e:
+                    # Письмо уже отправлено; повтор в пределах duplicate_window
+                    # отбросит дедупликация
+                    logger.warning(f"Could not delete dead letter {seq}: {e}")
+
+    async def _publish(self, js: JetStreamContext, seq: int, original: str) -> None:
+        await js.publish(
+            subject=self.config.subject,
+            payload=original.encode(),
+            timeout=self.config.publish_timeout_seconds,
+            headers={"Nats-Msg-Id": f"replay-{seq}", "content-type": "text/plain"},
+        )
+
+
+dead_letter_replayer = DeadLetterReplayer(
+    nats_url=str(settings.nats.url),
+    config=settings.dead_letter_replay,
+)
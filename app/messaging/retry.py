@@ -0,0 +1,45 @@
+import random
+
+from aiosmtplib.errors import (
+    SMTPAuthenticationError,
+    SMTPConnectResponseError,
+    SMTPHeloError,
+    SMTPRecipientsRefused,
+    SMTPResponseException,
+)
+from core.config import EmailRetryConfig
+from faststream.nats.message import NatsMessage
+
+# Отказы уровня соединения говорят о сервере или настройках, а не о письме:
+# после исправления повтор пройдёт, поэтому они временные даже с кодом 5xx
+CONNECTION_ERRORS = (SMTPAuthenticationError, SMTPConnectResponseError, SMTPHeloError)
+
+
+def is_permanent(error: Exception) -> bool:
+    """5xx на конкретное письмо (адрес, отправитель, данные) не исправится повтором."""
+    if isinstance(error, SMTPRecipientsRefused):
+        return bool(error.recipients) and all(
+            recipient.code >= 500 for recipient in error.recipients
+        )
+    if isinstance(error, CONNECTION_ERRORS):
+        return False
+    return isinstance(error, SMTPResponseException) and error.code >= 500
+
+
+def delivery_attempt(raw_msg: NatsMessage) -> int:
+    """Номер доставки из метаданных JetStream, начиная с 1."""
+    try:
+        return raw_msg.raw_message.metadata.num_delivered or 1
+    except Exception:
+        # Сообщения вне JetStream (например, в тестовом брокере) метаданных
+        # не несут
+        return 1
+
+
+def backoff_delay(attempt: int, config: EmailRetryConfig) -> float:
+    """Экспоненциальная задержка перед попыткой attempt + 1 с разбросом ±jitter."""
+    delay = min(
+        config.backoff_max_seconds,
+        config.backoff_base_seconds * config.backoff_multiplier ** (attempt - 1),
+    )
+    return delay * random.uniform(1 - config.jitter, 1 + config.jitter)
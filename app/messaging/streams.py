@@ -13,6 +13,9 @@ email_stream = JStream(
     max_msgs=100,
     max_msg_size=10 * 1024 * 1024,
     duplicate_window=5 * 60,
+    # Переполненный стрим отклоняет публикацию, а не вытесняет неотправленные
+    # письма: запись outbox тогда остаётся pending и уходит следующей пачкой
+    discard=DiscardPolicy.NEW,
 )
 
 dead_letters_stream = JStream(
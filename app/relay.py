@@ -0,0 +1,30 @@
+import asyncio
+import logging
+import signal
+
+from db.outbox_retention import outbox_retention
+from messaging.outbox_relay import outbox_relay
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await outbox_relay.start()
+    await outbox_retention.start()
+    await stop.wait()
+    await outbox_retention.stop()
+    await outbox_relay.stop()
+    logger.info(
+        f"Outbox relay stopped: {outbox_relay.stats.published} published, "
+        f"{outbox_relay.stats.publish_errors} publish errors"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
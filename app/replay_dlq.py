@@ -0,0 +1,69 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from core.config import settings
+from messaging.replay import DeadLetterReplayer, ReplayFilter, ReplayProgress
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def parse_time(value: str) -> datetime:
+    moment = datetime.fromisoformat(value)
+    # Время без зоны считаем UTC, как и timestamp в payload
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def report(progress: ReplayProgress) -> None:
+    logger.info(
+        f"scanned {progress.scanned}/{progress.total}, "
+        f"matched {progress.matched}, replayed {progress.replayed}, "
+        f"errors {progress.publish_errors}, seq {progress.last_sequence}, "
+        f"{progress.rate:.1f} msg/s"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    config = settings.dead_letter_replay
+    parser = argparse.ArgumentParser(
+        description="Replay emails from the dead-letter stream to email.send"
+    )
+    parser.add_argument("--error", help="Replay only errors containing this text")
+    parser.add_argument("--since", type=parse_time, help="ISO time, inclusive")
+    parser.add_argument("--until", type=parse_time, help="ISO time, inclusive")
+    parser.add_argument("--rate", type=float, default=config.rate_per_second)
+    parser.add_argument("--batch-size", type=int, default=config.batch_size)
+    parser.add_argument(
+        "--keep", action="store_true", help="Do not delete replayed dead letters"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only count matching messages"
+    )
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    config = settings.dead_letter_replay.model_copy(
+        update={
+            "rate_per_second": args.rate,
+            "batch_size": args.batch_size,
+            "delete_replayed": settings.dead_letter_replay.delete_replayed
+            and not args.keep,
+        }
+    )
+    replayer = DeadLetterReplayer(str(settings.nats.url), config)
+    progress = await replayer.replay(
+        ReplayFilter(error=args.error, since=args.since, until=args.until),
+        dry_run=args.dry_run,
+        on_progress=report,
+    )
+    report(progress)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
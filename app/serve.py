@@ -0,0 +1,180 @@
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+# Импортируется первым: от него отсчитывается время старта
+from core.startup import startup_stats
+
+import uvicorn
+from core.config import ServerConfig, get_settings
+
+logger = logging.getLogger(__name__)
+
+RESPAWN_DELAY_SECONDS = 1
+POLL_INTERVAL_SECONDS = 0.2
+# Код выхода uvicorn, если не удался startup в lifespan
+STARTUP_FAILURE = 3
+
+
+def bind_socket(config: ServerConfig) -> socket.socket:
+    family = socket.AF_INET6 if ":" in config.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((config.host, config.port))
+    sock.listen(config.backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(app, sock: socket.socket, config: ServerConfig) -> None:
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app,
+            loop=config.loop,
+            http=config.http,
+            lifespan="on",
+            backlog=config.backlog,
+            timeout_graceful_shutdown=config.timeout_graceful_shutdown,
+        )
+    )
+    server.run(sockets=[sock])
+    # uvicorn.Server.run при неудачном startup просто возвращается,
+    # код выхода 3 выставляет только uvicorn.main.run
+    if not server.started:
+        sys.exit(STARTUP_FAILURE)
+
+
+def spawn(app, sock: socket.socket, config: ServerConfig) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    # Воркер, в том числе перезапущенный спустя часы после мастера:
+    # готовность считается от fork
+    startup_stats.reset()
+    # Обработчики мастера снимаются, uvicorn ставит свои
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # До lifespan, где ставится обработчик перезагрузки ключей, SIGHUP
+    # не должен завершать воркер
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    code = 0
+    try:
+        serve(app, sock, config)
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        logger.exception("Worker crashed")
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def signal_children(children: set[int], signum: int) -> None:
+    for pid in children:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+
+def run(config: ServerConfig) -> None:
+    """Prefork-запуск: мастер один раз импортирует приложение, читает
+    настройки и разбирает ключи, открывает сокет и форкает воркеры.
+    Воркеры наследуют всё это готовым и принимают соединения с общего
+    сокета; упавший воркер перезапускается. Подключения к Redis, БД и
+    NATS открываются уже в воркерах, в lifespan. SIGHUP мастеру
+    перечитывает ключи JWT в нём и во всех воркерах.
+    """
+    from main import create_app, reload_signing_key
+
+    workers = config.workers or os.cpu_count() or 1
+    app = create_app()
+    sock = bind_socket(config)
+    logger.info(
+        f"Listening on {config.host}:{config.port} with {workers} workers, "
+        f"imports took {startup_stats.import_seconds:.3f}s"
+    )
+    if workers == 1:
+        serve(app, sock, config)
+        return
+
+    # Объекты, созданные до fork, делятся copy-on-write; freeze убирает их
+    # из обхода GC, чтобы сборка мусора в воркерах не копировала страницы
+    gc.freeze()
+    children: set[int] = set()
+    stop_requested = False
+    deadline: float | None = None
+    exit_code = 0
+
+    def request_stop(signum, frame) -> None:
+        nonlocal stop_requested
+        stop_requested = True
+
+    def reload_keys(signum, frame) -> None:
+        # Мастер тоже перечитывает ключи: перезапущенные воркеры
+        # наследуют key_ring от него
+        reload_signing_key()
+        signal_children(children, signal.SIGHUP)
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGHUP, reload_keys)
+
+    for _ in range(workers):
+        children.add(spawn(app, sock, config))
+
+    while children:
+        if stop_requested and deadline is None:
+            deadline = time.monotonic() + config.timeout_graceful_shutdown
+            signal_children(children, signal.SIGTERM)
+        elif deadline is not None and time.monotonic() > deadline:
+            logger.warning("Graceful shutdown timed out, killing workers")
+            signal_children(children, signal.SIGKILL)
+            deadline = float("inf")
+
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if not pid:
+            time.sleep(POLL_INTERVAL_SECONDS)
+            continue
+        children.discard(pid)
+        code = os.waitstatus_to_exitcode(status)
+        if stop_requested:
+            continue
+        if code == STARTUP_FAILURE:
+            # Не удалось подключиться к зависимостям: перезапуск воркеров
+            # этого не исправит, пусть контейнер перезапустит оркестратор
+            logger.error(f"Worker {pid} failed to start, shutting down")
+            stop_requested = True
+            exit_code = STARTUP_FAILURE
+            continue
+        logger.warning(f"Worker {pid} exited with code {code}, restarting")
+        time.sleep(RESPAWN_DELAY_SECONDS)
+        children.add(spawn(app, sock, config))
+    sock.close()
+    sys.exit(exit_code)
+
+
+def main() -> None:
+    config = get_settings().server
+    parser = argparse.ArgumentParser(description="Run the API with prefork workers")
+    parser.add_argument("--host", default=config.host)
+    parser.add_argument("--port", type=int, default=config.port)
+    parser.add_argument("--workers", type=int, default=config.workers)
+    parser.add_argument(
+        "--loop", choices=["auto", "asyncio", "uvloop"], default=config.loop
+    )
+    parser.add_argument(
+        "--http", choices=["auto", "h11", "httptools"], default=config.http
+    )
+    parser.add_argument("--backlog", type=int, default=config.backlog)
+    args = parser.parse_args()
+    run(config.model_copy(update=vars(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+class PasswordHashingOverloadedError(Exception):
+    """Очередь пула хэширования паролей переполнена"""
+
+
+class ReplayInProgressError(Exception):
+    """Повторная отправка из dead-letter стрима уже запущена"""
@@ -7,10 +7,12 @@ def extract_jti(payload: dict) -> str | None:
     return jti
 
 
-def handle_failed_message(msg: Any, error: str):
+def handle_failed_message(msg: Any, error: str, attempts: int | None = None):
     payload = {
         "original_message": msg,
         "error": error,
         "timestamp": datetime.now(tz=timezone.utc),
     }
+    if attempts is not None:
+        payload["attempts"] = attempts
     return payload
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+
+from core.config import settings
+from core.metrics import NAMESPACE, MetricsWriter
+from core.smtp_pool import smtp_pool
+from faststream import Logger
+from faststream.asgi import AsgiFastStream, AsgiResponse, get
+from faststream.asgi.types import Scope
+from faststream.nats import NatsBroker, NatsMessage, PullSub
+from messaging.handlers import handle_email
+from messaging.metrics import write_consumer_metrics
+from messaging.streams import email_stream
+
+logging.basicConfig(level=logging.INFO)
+
+
+@get(include_in_schema=False)
+async def metrics(scope: Scope) -> AsgiResponse:
+    writer = MetricsWriter(namespace=NAMESPACE)
+    write_consumer_metrics(writer)
+    return AsgiResponse(
+        writer.render().encode(),
+        200,
+        headers={"content-type": MetricsWriter.CONTENT_TYPE},
+    )
+
+
+broker = NatsBroker(str(settings.nats.url))
+# Статистика консьюмера и SMTP-пула живёт в процессе воркера, поэтому
+# каждый воркер отдаёт свой /metrics
+app = AsgiFastStream(broker, asgi_routes=[("/metrics", metrics)])
+
+
+# Все процессы воркера читают один durable pull-консьюмер: JetStream
+# раздаёт им сообщения по мере fetch, так что воркеры масштабируются
+# числом процессов, а внутри процесса — max_workers
+@broker.subscriber(
+    subject="email.send",
+    stream=email_stream,
+    durable=settings.email_worker.durable,
+    pull_sub=PullSub(
+        batch_size=settings.email_worker.batch_size,
+        timeout=settings.email_worker.fetch_timeout_seconds,
+    ),
+    max_workers=settings.email_worker.concurrency,
+    no_ack=True,
+)
+async def handler(msg: str, raw_msg: NatsMessage, logger: Logger):
+    await handle_email(msg, raw_msg, broker, logger)
+
+
+@app.after_shutdown
+async def shutdown() -> None:
+    await smtp_pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        app.run(
+            run_extra_options={
+                "host": settings.email_worker.metrics_host,
+                "port": settings.email_worker.metrics_port,
+            }
+        )
+    )
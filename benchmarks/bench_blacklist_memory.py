@@ -0,0 +1,136 @@
+"""Память Redis под чёрный список: ключ на jti против корзин-хэшей по exp,
+целых и разделённых на --shards хэшей, как в core.redis_client.
+
+Пишет --count отзывов в каждую раскладку и замеряет прирост used_memory.
+Для хэшей показывает, сколько их осталось listpack: хэш больше
+hash-max-listpack-entries полей Redis хранит как hashtable, и экономия
+пропадает. Базу --db перед каждым прогоном очищает FLUSHDB, поэтому нужна
+отдельная база или отдельный инстанс Redis.
+
+Запуск: python benchmarks/bench_blacklist_memory.py --count 10000000 --db 15 \
+    --lifetime-seconds 2592000 --shards 16
+"""
+
+import argparse
+import base64
+import random
+import time
+import uuid
+import zlib
+from functools import partial
+
+import redis
+
+BUCKET_SECONDS = 5 * 60
+CHUNK = 10_000
+
+
+def pack_token_id(token_id: str) -> str:
+    # Та же упаковка, что в core.redis_client.pack_token_id; модуль
+    # не импортируется, чтобы бенчмарку не требовались настройки приложения
+    raw = uuid.UUID(token_id).bytes
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def write_string_keys(client: redis.Redis, entries: list[tuple[str, int]]) -> None:
+    now = int(time.time())
+    pipe = client.pipeline(transaction=False)
+    for token_id, expires_at in entries:
+        pipe.set(f"blacklist:{token_id}", "blacklisted", ex=expires_at - now)
+    pipe.execute()
+
+
+def write_buckets(
+    client: redis.Redis, entries: list[tuple[str, int]], shards: int
+) -> None:
+    # Ключ корзины тот же, что у core.redis_client.blacklist_key
+    pipe = client.pipeline(transaction=False)
+    keys = {}
+    for token_id, expires_at in entries:
+        field = pack_token_id(token_id)
+        bucket = expires_at // BUCKET_SECONDS
+        key = f"blacklist:{bucket}:{zlib.crc32(field.encode()) % shards}"
+        pipe.hset(key, field, 1)
+        keys[key] = (bucket + 1) * BUCKET_SECONDS
+    for key, bucket_end in keys.items():
+        pipe.expireat(key, bucket_end)
+    pipe.execute()
+
+
+def hash_encodings(client: redis.Redis) -> tuple[int, int, int]:
+    """Возвращает (хэшей всего, из них listpack, полей в самом большом)."""
+    total = listpack = largest = 0
+    keys = list(client.scan_iter(match="blacklist:*", count=1000))
+    for start in range(0, len(keys), 1000):
+        chunk = keys[start : start + 1000]
+        pipe = client.pipeline(transaction=False)
+        for key in chunk:
+            pipe.type(key)
+            pipe.object("encoding", key)
+            pipe.hlen(key)
+        results = pipe.execute(raise_on_error=False)
+        for key_type, encoding, fields in zip(*[iter(results)] * 3):
+            if key_type != b"hash":
+                continue
+            total += 1
+            listpack += encoding in (b"listpack", b"ziplist")
+            largest = max(largest, fields)
+    return total, listpack, largest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--db", type=int, default=15)
+    parser.add_argument("--count", type=int, default=10_000_000)
+    parser.add_argument(
+        "--lifetime-seconds",
+        type=int,
+        default=15 * 60,
+        help="оставшееся время жизни токенов распределено равномерно до этого значения",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=16,
+        help="RevocationConfig.blacklist_bucket_shards",
+    )
+    args = parser.parse_args()
+
+    layouts = {
+        "key per jti": write_string_keys,
+        "bucketed hashes": partial(write_buckets, shards=1),
+        f"{args.shards} shards/bucket": partial(write_buckets, shards=args.shards),
+    }
+    client = redis.Redis(host=args.host, port=args.port, db=args.db)
+    print(
+        f"{'layout':<20} {'used memory':>14} {'bytes/entry':>12} {'keys':>10} "
+        f"{'listpack':>10} {'max fields':>11}"
+    )
+    for name, write in layouts.items():
+        client.flushdb()
+        before = client.info("memory")["used_memory"]
+        now = int(time.time())
+        written = 0
+        while written < args.count:
+            size = min(CHUNK, args.count - written)
+            entries = [
+                (str(uuid.uuid4()), now + random.randint(60, args.lifetime_seconds))
+                for _ in range(size)
+            ]
+            write(client, entries)
+            written += size
+        used = client.info("memory")["used_memory"] - before
+        hashes, listpack, largest = hash_encodings(client)
+        encoded = f"{listpack}/{hashes}" if hashes else "-"
+        print(
+            f"{name:<20} {used / 1024 / 1024:>11.1f} MB "
+            f"{used / args.count:>12.1f} {client.dbsize():>10} "
+            f"{encoded:>10} {largest or '-':>11}"
+        )
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
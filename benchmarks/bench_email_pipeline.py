@@ -0,0 +1,208 @@
+"""Пропускная способность отправки писем: подписчик email.send из
+messaging/broker.py (или воркер) поверх TestNatsBroker и SMTP-приёмник
+aiosmtpd в том же процессе.
+
+Приёмнику задаются задержка ответа на DATA и доля отказов: временных
+(451) и постоянных (550). Тестовый брокер не передоставляет сообщения
+после nack, поэтому передоставку делает сам бенчмарк: письмо, получившее
+временный отказ, публикуется снова сразу, без паузы backoff, но не
+больше email_worker.retry.max_attempts раз. Метаданных JetStream у
+тестового брокера нет, поэтому номер попытки передаётся обработчику
+подменой delivery_attempt, и на последней попытке он, как в проде,
+отправляет письмо в DLQ. Задержка считается от первой публикации до
+приёма письма приёмником.
+
+Приложение импортируется целиком, поэтому нужны его настройки (.env);
+SMTP перенастраивается на приёмник через ENV_SMTP__*. aiosmtpd в
+зависимости проекта не входит: pip install aiosmtpd.
+
+Запуск: python benchmarks/bench_email_pipeline.py --messages 5000 \
+    --latency-ms 20 --failure-rate 0.05 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import logging
+import os
+import random
+import socket
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from unittest.mock import patch
+
+from aiosmtpd.controller import Controller
+
+DELIVERED = "delivered"
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+
+@dataclass(slots=True)
+class SinkHandler:
+    latency: float
+    jitter: float
+    failure_rate: float
+    permanent_rate: float
+    # Исход последней попытки и время приёма по адресу получателя
+    outcomes: dict[str, str] = field(default_factory=dict)
+    received_at: dict[str, float] = field(default_factory=dict)
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        if self.latency:
+            await asyncio.sleep(
+                max(0.0, random.gauss(self.latency, self.jitter * self.latency))
+            )
+        roll = random.random()
+        recipient = envelope.rcpt_tos[0]
+        if roll < self.permanent_rate:
+            self.outcomes[recipient] = PERMANENT
+            return "550 Mailbox unavailable"
+        if roll < self.permanent_rate + self.failure_rate:
+            self.outcomes[recipient] = TRANSIENT
+            return "451 Try again later"
+        self.outcomes[recipient] = DELIVERED
+        self.received_at[recipient] = time.perf_counter()
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def configure_app(port: int, pool_size: int) -> None:
+    # До импорта приложения: настройки и пул SMTP создаются при импорте
+    os.environ.update(
+        {
+            "ENV_SMTP__HOST": "127.0.0.1",
+            "ENV_SMTP__PORT": str(port),
+            "ENV_SMTP__USE_TLS": "0",
+            "ENV_SMTP__AUTH": "0",
+            "ENV_SMTP__POOL_SIZE": str(pool_size),
+            "ENV_EMAIL_WORKER__API_SUBSCRIBER_ENABLED": "1",
+        }
+    )
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args: argparse.Namespace, sink: SinkHandler) -> None:
+    from core.config import settings
+    from core.smtp_pool import smtp_pool
+    from faststream.nats import TestNatsBroker
+    from messaging.handlers import consumer_stats
+
+    if args.target == "worker":
+        from worker import broker
+    else:
+        from messaging.broker import router
+
+        broker = router.broker
+
+    # Лог на каждое сообщение заметно съедает пропускную способность
+    broker.logger.setLevel(logging.ERROR)
+    logging.getLogger("mail.log").setLevel(logging.WARNING)
+    max_attempts = settings.email_worker.retry.max_attempts
+    semaphore = asyncio.Semaphore(args.concurrency)
+    published_at: dict[str, float] = {}
+    # Номер текущей попытки по адресу получателя (он же тело сообщения)
+    attempts: dict[str, int] = {}
+    redeliveries = 0
+
+    async def deliver(broker, recipient: str) -> None:
+        nonlocal redeliveries
+        async with semaphore:
+            published_at[recipient] = time.perf_counter()
+            for attempt in range(1, max_attempts + 1):
+                attempts[recipient] = attempt
+                await broker.publish(recipient, subject="email.send")
+                if sink.outcomes.get(recipient) in (DELIVERED, PERMANENT):
+                    return
+                if attempt < max_attempts:
+                    redeliveries += 1
+
+    def delivery_attempt(raw_msg) -> int:
+        return attempts[raw_msg.body.decode()]
+
+    recipients = [f"bench{i}@example.com" for i in range(args.messages)]
+    with patch("messaging.handlers.delivery_attempt", delivery_attempt):
+        async with TestNatsBroker(broker) as test_broker:
+            # Прогрев: соединения пула открыты до замера
+            await asyncio.gather(
+                *(deliver(test_broker, f"warmup{i}@example.com") for i in range(10))
+            )
+            sink.outcomes.clear()
+            sink.received_at.clear()
+            published_at.clear()
+            redeliveries = 0
+            before = dataclasses.replace(consumer_stats)
+            connects_before = smtp_pool.stats.connects
+
+            start = time.perf_counter()
+            await asyncio.gather(*(deliver(test_broker, r) for r in recipients))
+            elapsed = time.perf_counter() - start
+    await smtp_pool.close()
+
+    latencies = [
+        (sink.received_at[r] - published_at[r]) * 1000
+        for r in recipients
+        if r in sink.received_at
+    ]
+    delivered = len(latencies)
+    print(f"{'target':<26} {args.target}")
+    print(f"{'messages':<26} {args.messages}")
+    print(f"{'delivered':<26} {delivered}")
+    print(f"{'messages/sec':<26} {delivered / elapsed:.0f}")
+    print(f"{'p50 latency, ms':<26} {percentile(latencies, 0.50):.2f}")
+    print(f"{'p99 latency, ms':<26} {percentile(latencies, 0.99):.2f}")
+    print(f"{'redeliveries':<26} {redeliveries}")
+    print(f"{'handler nacks':<26} {consumer_stats.retried - before.retried}")
+    dead_lettered = consumer_stats.dead_lettered - before.dead_lettered
+    permanent = consumer_stats.permanent_failures - before.permanent_failures
+    print(f"{'dead-lettered':<26} {dead_lettered}")
+    print(f"{'  permanent failures':<26} {permanent}")
+    print(f"{'  retries exhausted':<26} {dead_lettered - permanent}")
+    print(f"{'smtp connects':<26} {smtp_pool.stats.connects - connects_before}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--target", choices=["api", "worker"], default="api")
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--latency-jitter", type=float, default=0.2, help="Stddev as share of mean"
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--permanent-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    sink = SinkHandler(
+        latency=args.latency_ms / 1000,
+        jitter=args.latency_jitter,
+        failure_rate=args.failure_rate,
+        permanent_rate=args.permanent_rate,
+    )
+    controller = Controller(sink, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        configure_app(controller.port, args.pool_size)
+        asyncio.run(run(args, sink))
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
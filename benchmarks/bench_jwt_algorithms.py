@@ -0,0 +1,76 @@
+"""Скорость подписи и проверки JWT для RS256, ES256 и EdDSA на текущей машине.
+
+Запуск: python benchmarks/bench_jwt_algorithms.py [--iterations N]
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import jwt
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from core.keys import KeyRing, generate_private_key  # noqa: E402
+
+ALGORITHMS = ("RS256", "ES256", "EdDSA")
+
+
+def measure(func, iterations: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    payload = {
+        "type": "access",
+        "sub": "user@example.com",
+        "role": "user",
+        "iat": now,
+        "exp": now + timedelta(minutes=15),
+    }
+
+    print(
+        f"{'algorithm':<10} {'sign ops/sec':>14} {'verify ops/sec':>16} {'token bytes':>12}"
+    )
+    for algorithm in ALGORITHMS:
+        keys = KeyRing(algorithm=algorithm)
+        keys.add_signing_key(generate_private_key(algorithm))
+        signing_key = keys.signing_key
+        verification_key = keys.verification_key(signing_key.kid)
+        headers = {"kid": signing_key.kid}
+
+        def sign():
+            return jwt.encode(
+                payload,
+                signing_key.private_key,
+                algorithm=signing_key.algorithm,
+                headers=headers,
+            )
+
+        token = sign()
+
+        def verify():
+            return jwt.decode(
+                token,
+                verification_key.public_key,
+                algorithms=[verification_key.algorithm],
+            )
+
+        sign_ops = measure(sign, args.iterations)
+        verify_ops = measure(verify, args.iterations)
+        print(f"{algorithm:<10} {sign_ops:>14.0f} {verify_ops:>16.0f} {len(token):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Подпись и проверка JWT: PEM-текст против заранее разобранных ключей.
+
+Запуск: python benchmarks/bench_key_parsing.py [--iterations N]
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+def measure(func, iterations: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_key = private_key.public_key()
+    private_pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption(),
+    ).decode()
+    public_pem = public_key.public_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+
+    now = datetime.now(timezone.utc)
+    payload = {
+        "sub": "user@example.com",
+        "iat": now,
+        "exp": now + timedelta(minutes=15),
+    }
+    token = jwt.encode(payload, private_key, algorithm="RS256")
+
+    results = {
+        "sign (PEM)": measure(
+            lambda: jwt.encode(payload, private_pem, algorithm="RS256"),
+            args.iterations,
+        ),
+        "sign (parsed)": measure(
+            lambda: jwt.encode(payload, private_key, algorithm="RS256"),
+            args.iterations,
+        ),
+        "verify (PEM)": measure(
+            lambda: jwt.decode(token, public_pem, algorithms=["RS256"]),
+            args.iterations,
+        ),
+        "verify (parsed)": measure(
+            lambda: jwt.decode(token, public_key, algorithms=["RS256"]),
+            args.iterations,
+        ),
+    }
+
+    for name, ops in results.items():
+        print(f"{name:<16} {ops:>10.0f} ops/sec")
+    print(
+        f"sign speedup:   x{results['sign (parsed)'] / results['sign (PEM)']:.2f}\n"
+        f"verify speedup: x{results['verify (parsed)'] / results['verify (PEM)']:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Время старта API, накопительно от запуска интерпретатора: импорт
+модулей, create_app (всё, что serve.py делает до fork) и готовность —
+завершённый lifespan, как у воркера. Подключения к Redis и NATS в
+lifespan заменены заглушками, остальное (калибровка bcrypt, запуск
+фоновых задач) выполняется как есть. Дополнительно — самые медленные
+модули по python -X importtime.
+
+Каждый прогон — отдельный процесс, поэтому кэш модулей не мешает
+замеру. Нужны настройки приложения (.env).
+
+Запуск: python benchmarks/bench_startup.py [--runs N] [--top N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+
+SCRIPT = """
+import asyncio
+import time
+from unittest.mock import patch
+
+from core.startup import startup_stats
+from main import create_app
+from core.redis_client import redis_helper
+from core.revocation import revocation_filter
+from messaging import router
+
+
+async def noop(*args, **kwargs):
+    pass
+
+
+async def lifespan(app):
+    async with app.router.lifespan_context(app):
+        pass
+
+
+app = create_app()
+created = time.perf_counter() - startup_stats.started_at
+broker = type(router.broker)
+with (
+    patch.object(redis_helper, "connect", noop),
+    patch.object(redis_helper, "close", noop),
+    patch.object(revocation_filter, "start", noop),
+    patch.object(broker, "connect", noop),
+    patch.object(broker, "start", noop),
+    patch.object(broker, "close", noop),
+):
+    asyncio.run(lifespan(app))
+print(startup_stats.import_seconds, created, startup_stats.ready_seconds)
+"""
+
+
+def run_once() -> tuple[float, float, float, float]:
+    """Возвращает (процесс целиком, импорт, + create_app, + lifespan)."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=APP_DIR,
+        env={**os.environ, "PYTHONPATH": str(APP_DIR)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = time.perf_counter() - start
+    imported, created, ready = map(
+        float, result.stdout.strip().splitlines()[-1].split()
+    )
+    return wall, imported, created, ready
+
+
+def slowest_imports(top: int) -> list[tuple[int, int, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        cwd=APP_DIR,
+        env={**os.environ, "PYTHONPATH": str(APP_DIR)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # Первый прогон прогревает кэш байткода и страницы ФС
+    run_once()
+    walls, imports, created, ready = zip(*(run_once() for _ in range(args.runs)))
+
+    print(f"{'stage, cumulative':<24} {'median, ms':>11} {'min, ms':>9} {'max, ms':>9}")
+    for name, values in (
+        ("import", imports),
+        ("+ create_app", created),
+        ("+ lifespan (ready)", ready),
+        ("process total", walls),
+    ):
+        print(
+            f"{name:<24} {statistics.median(values) * 1000:>11.1f} "
+            f"{min(values) * 1000:>9.1f} {max(values) * 1000:>9.1f}"
+        )
+
+    print()
+    print(f"{'self, ms':>9} {'cumulative, ms':>15}  module")
+    for self_us, cumulative_us, name in slowest_imports(args.top):
+        print(f"{self_us / 1000:>9.1f} {cumulative_us / 1000:>15.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()